@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+from fastapi import HTTPException
+
+
+def callback_key(provider: str, code: str, nonce: Optional[str]) -> str:
+    """
+    Key a callback by provider, authorization code and nonce cookie
+
+    The nonce cookie never appears in a URL, so someone replaying a leaked
+    callback URL from another browser gets a different key and is refused by
+    the provider instead of receiving the original session. Only the hash is
+    kept, so authorization codes aren't held in memory.
+    """
+    raw = f"{provider}\0{code}\0{nonce or ''}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class CompletedCallback:
+    __slots__ = ("result", "error", "expires_at")
+
+    def __init__(self, result: Any, error: Optional[HTTPException], expires_at: float):
+        self.result = result
+        self.error = error
+        self.expires_at = expires_at
+
+
+class CallbackDeduplicator:
+    """
+    Single-flight registry for OAuth callbacks
+
+    - The first callback for a key runs the login; concurrent duplicates
+      await its result instead of exchanging the code again
+    - Completed results (and HTTPException failures) are kept for
+      `ttl_seconds`, so a late duplicate gets the same answer without another
+      round trip to the provider
+    - Unexpected errors aren't cached, so a retry can still succeed
+
+    Must only be used from the event loop thread.
+
+    Args:
+        ttl_seconds: How long completed results are kept
+        max_entries: Maximum completed results kept
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._completed: "OrderedDict[str, CompletedCallback]" = OrderedDict()
+        self.counters = {
+            "logins": 0,
+            "coalesced": 0,
+            "replayed": 0,
+            "evictions": 0,
+        }
+
+    def _remember(
+        self, key: str, result: Any, error: Optional[HTTPException] = None
+    ) -> None:
+        now = self._clock()
+        # Entries are appended in expiry order, so expired ones are at the front
+        while self._completed:
+            oldest = next(iter(self._completed.values()))
+            if oldest.expires_at > now and len(self._completed) < self.max_entries:
+                break
+            self._completed.popitem(last=False)
+            self.counters["evictions"] += 1
+        self._completed[key] = CompletedCallback(result, error, now + self.ttl_seconds)
+
+    async def run(
+        self, key: str, login: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Run `login` once per key
+
+        Args:
+            key: Callback key from callback_key
+            login: Coroutine function performing the login
+
+        Returns:
+            Tuple of (result, duplicate), where duplicate is True if the
+            result came from another request for the same key
+
+        Raises:
+            HTTPException: The login's failure, also for duplicates
+        """
+        completed = self._completed.get(key)
+        if completed is not None and completed.expires_at > self._clock():
+            self.counters["replayed"] += 1
+            if completed.error is not None:
+                raise completed.error
+            return completed.result, True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(inflight), True
+
+        self.counters["logins"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await login()
+        except HTTPException as exc:
+            self._remember(key, None, exc)
+            future.set_exception(exc)
+            # Mark the exception retrieved when nobody else was waiting
+            future.exception()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        else:
+            self._remember(key, result)
+            future.set_result(result)
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                # Cancelled: duplicates see the cancellation and may retry
+                future.cancel()
+
+        return result, False
+
+    def clear(self) -> None:
+        self._completed.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.counters,
+            "inflight": len(self._inflight),
+            "completed": len(self._completed),
+        }
+
+
+callback_deduplicator = CallbackDeduplicator(
+    ttl_seconds=settings.CALLBACK_DEDUP_TTL_SECONDS,
+    max_entries=settings.CALLBACK_DEDUP_MAX_ENTRIES,
+)
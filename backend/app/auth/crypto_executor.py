@@ -0,0 +1,227 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.auth.providers import decode_id_token, get_provider
+from app.auth.utils import read_refresh_token, seal_refresh_token
+from app.config import settings
+
+# Rough cost of each operation in microseconds, measured on a 2048-bit RSA
+# key, a typical session JWT and a Google refresh token. The thread handoff
+# itself costs ~60us, which is why cheap operations stay inline.
+COST_RSA_VERIFY = 110
+COST_HMAC_PER_TOKEN = 80
+COST_AES = 10
+
+
+def _timed(fn: Callable, args: Tuple) -> Tuple[float, float, Any]:
+    # Runs in the worker; time.monotonic is system-wide on Linux, so the
+    # start time is comparable across processes
+    started = time.monotonic()
+    result = fn(*args)
+    return started, time.monotonic() - started, result
+
+
+def _noop() -> None:
+    pass
+
+
+class CryptoExecutor:
+    """
+    Runs CPU-bound crypto off the event loop
+
+    Work whose estimated cost reaches `offload_threshold_us` goes to a
+    dedicated bounded thread pool; in "process" mode RSA verification goes to
+    a process pool instead, so it doesn't contend for the GIL. Cheaper work
+    runs inline, where a thread handoff would cost more than it saves.
+
+    When `max_pending` submissions are already in flight, new work runs
+    inline on the caller instead of queueing without bound.
+
+    Args:
+        mode: "thread", "process" or "inline" (never offload)
+        max_workers: Workers per pool
+        max_pending: In-flight submissions before work runs inline
+        offload_threshold_us: Minimum estimated cost to offload
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        max_workers: int,
+        max_pending: int,
+        offload_threshold_us: float,
+    ):
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.offload_threshold_us = offload_threshold_us
+
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.counters: Dict[str, float] = {
+            "inline": 0,
+            "offloaded": 0,
+            "overflow": 0,
+            "completed": 0,
+            "max_inflight": 0,
+            "exec_seconds_total": 0.0,
+            "exec_seconds_max": 0.0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    @property
+    def uses_processes(self) -> bool:
+        return self.mode == "process"
+
+    def _executor(self, processes: bool) -> Executor:
+        with self._lock:
+            if processes:
+                if self._processes is None:
+                    # spawn: forking a process that runs threads isn't safe
+                    self._processes = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                return self._processes
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="crypto"
+                )
+            return self._threads
+
+    def _incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    async def run(
+        self, fn: Callable, *args: Any, cost: float, processes: bool = False
+    ) -> Any:
+        """
+        Run `fn(*args)` inline or on a pool depending on its estimated cost
+
+        Args:
+            fn: Function to run; must be picklable when `processes` is set
+            *args: Arguments for `fn`
+            cost: Estimated cost in microseconds
+            processes: Use the process pool when running in "process" mode
+        """
+        if self.mode == "inline" or cost < self.offload_threshold_us:
+            self._incr("inline")
+            return fn(*args)
+
+        with self._lock:
+            if self._inflight >= self.max_pending:
+                self.counters["overflow"] += 1
+                overflow = True
+            else:
+                overflow = False
+                self._inflight += 1
+                self.counters["offloaded"] += 1
+                self.counters["max_inflight"] = max(
+                    self.counters["max_inflight"], self._inflight
+                )
+        if overflow:
+            return fn(*args)
+
+        executor = self._executor(processes and self.uses_processes)
+        submitted = time.monotonic()
+        try:
+            started, elapsed, result = await asyncio.get_running_loop().run_in_executor(
+                executor, _timed, fn, args
+            )
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+        wait = max(started - submitted, 0.0)
+        with self._lock:
+            self.counters["completed"] += 1
+            self.counters["exec_seconds_total"] += elapsed
+            self.counters["exec_seconds_max"] = max(
+                self.counters["exec_seconds_max"], elapsed
+            )
+            self.counters["wait_seconds_total"] += wait
+            self.counters["wait_seconds_max"] = max(
+                self.counters["wait_seconds_max"], wait
+            )
+        return result
+
+    def warm(self) -> None:
+        """
+        Start every worker ahead of the first request
+
+        Matters most in "process" mode, where each worker is a new
+        interpreter that imports the app before it can verify anything.
+        """
+        if self.mode == "inline":
+            return
+        executor = self._executor(self.uses_processes)
+        futures = [executor.submit(_noop) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pools = [self._threads, self._processes]
+            self._threads = self._processes = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            inflight = self._inflight
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "inflight": inflight,
+            # Submissions waiting for a free worker
+            "queue_depth": max(inflight - self.max_workers, 0),
+        }
+
+
+crypto_executor = CryptoExecutor(
+    mode=settings.CRYPTO_EXECUTOR,
+    max_workers=settings.CRYPTO_MAX_WORKERS,
+    max_pending=settings.CRYPTO_MAX_PENDING,
+    offload_threshold_us=settings.CRYPTO_OFFLOAD_THRESHOLD_US,
+)
+
+
+async def averify_id_token(id_token: str, provider: str = "google") -> Dict:
+    """verify_id_token for async handlers, run on the crypto executor"""
+    # Key lookup may fetch the JWKS over the network and needs the
+    # provider's cache, so it runs in a worker thread of this process
+    # whatever the executor mode; only the signature check is dispatched
+    oidc_provider = get_provider(provider)
+    jwk = await asyncio.to_thread(
+        oidc_provider.key_for_token,
+        id_token,
+        not crypto_executor.uses_processes,
+    )
+    return await crypto_executor.run(
+        decode_id_token,
+        id_token,
+        jwk,
+        oidc_provider.client_id,
+        oidc_provider.issuers,
+        cost=COST_RSA_VERIFY,
+        processes=crypto_executor.uses_processes,
+    )
+
+
+async def aseal_refresh_token(refresh_token: str) -> bytes:
+    """seal_refresh_token for async handlers, run on the crypto executor"""
+    return await crypto_executor.run(seal_refresh_token, refresh_token, cost=COST_AES)
+
+
+async def aread_refresh_token(user) -> Optional[str]:
+    """read_refresh_token for async handlers, run on the crypto executor"""
+    return await crypto_executor.run(read_refresh_token, user, cost=COST_AES)
@@ -0,0 +1,191 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from app.auth.providers import get_provider
+from app.auth.utils import read_refresh_token
+from app.config import settings
+from app.db.database import SessionLocal
+from app.models.user import User
+from sqlalchemy.orm import Session
+
+
+class AccessTokenUnavailable(Exception):
+    """Raised when no Google access token can be obtained for a user"""
+
+
+class CachedToken:
+    __slots__ = ("access_token", "expires_at")
+
+    def __init__(self, access_token: str, expires_at: float):
+        self.access_token = access_token
+        self.expires_at = expires_at
+
+
+class AccessTokenCache:
+    """
+    Per-user cache of Google access tokens
+
+    - Hits return the cached token; a token close to expiry is refreshed in
+      the background while the current one is still served (refresh-ahead)
+    - Misses decrypt the stored refresh token and call the token endpoint;
+      concurrent misses for the same user share one refresh
+    - Entries are bounded by an LRU limit
+
+    Must only be used from the event loop thread; the blocking refresh runs
+    in a worker thread.
+
+    Args:
+        max_entries: Maximum cached users
+        refresh_ahead_seconds: Remaining lifetime that triggers a
+            background refresh
+        expiry_skew_seconds: Safety margin subtracted from `expires_in`
+        session_factory: Callable returning a new database session
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        refresh_ahead_seconds: float,
+        expiry_skew_seconds: float,
+        session_factory: Callable[[], Session],
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self.expiry_skew_seconds = expiry_skew_seconds
+        self.session_factory = session_factory
+        self._clock = clock
+        self._entries: "OrderedDict[int, CachedToken]" = OrderedDict()
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_ahead": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "evictions": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(
+        self, user_id: int, access_token: str, expires_in: Optional[int] = None
+    ) -> None:
+        """Cache an access token that is valid for `expires_in` seconds"""
+        lifetime = (expires_in or 3600) - self.expiry_skew_seconds
+        self._entries.pop(user_id, None)
+        self._entries[user_id] = CachedToken(access_token, self._clock() + lifetime)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+    async def get(self, user_id: int) -> str:
+        """
+        Get a valid access token for a user
+
+        Raises:
+            AccessTokenUnavailable: If the user has no usable refresh token or
+                the refresh is rejected
+        """
+        entry = self._entries.get(user_id)
+        now = self._clock()
+        if entry is not None and entry.expires_at > now:
+            self.counters["hits"] += 1
+            self._entries.move_to_end(user_id)
+            if entry.expires_at - now < self.refresh_ahead_seconds:
+                self._refresh_in_background(user_id)
+            return entry.access_token
+
+        self.counters["misses"] += 1
+        return await self._refresh(user_id)
+
+    def _refresh_in_background(self, user_id: int) -> None:
+        if user_id in self._inflight:
+            return
+        self.counters["refresh_ahead"] += 1
+        task = asyncio.get_running_loop().create_task(self._refresh(user_id))
+        # The event loop only keeps weak references to tasks
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        # Errors are counted; the current token is still valid
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _refresh(self, user_id: int) -> str:
+        inflight = self._inflight.get(user_id)
+        if inflight is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = future
+        try:
+            access_token, expires_in = await asyncio.to_thread(self._fetch, user_id)
+        except Exception as exc:
+            self.counters["errors"] += 1
+            future.set_exception(exc)
+            # Mark the exception retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            self.counters["refreshes"] += 1
+            self.put(user_id, access_token, expires_in)
+            future.set_result(access_token)
+        finally:
+            del self._inflight[user_id]
+            if not future.done():
+                # Cancelled: coalesced callers see the cancellation and may retry
+                future.cancel()
+
+        return access_token
+
+    def _fetch(self, user_id: int) -> Tuple[str, Optional[int]]:
+        # Runs in a worker thread
+        db = self.session_factory()
+        try:
+            user = db.get(User, user_id)
+            refresh_token = read_refresh_token(user) if user else None
+            if refresh_token is None:
+                raise AccessTokenUnavailable("No refresh token stored for user")
+        finally:
+            db.close()
+
+        response = get_provider("google").refresh_access_token(refresh_token)
+        if response.status_code != 200:
+            raise AccessTokenUnavailable(f"Token refresh failed: {response.text}")
+
+        token_data = response.json()
+        return token_data["access_token"], token_data.get("expires_in")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+        }
+
+
+access_token_cache = AccessTokenCache(
+    max_entries=settings.GOOGLE_TOKEN_CACHE_MAX_ENTRIES,
+    refresh_ahead_seconds=settings.GOOGLE_TOKEN_REFRESH_AHEAD_SECONDS,
+    expiry_skew_seconds=settings.GOOGLE_TOKEN_EXPIRY_SKEW_SECONDS,
+    session_factory=SessionLocal,
+)
+
+
+async def get_google_access_token(user_id: int) -> str:
+    """
+    Get an access token for calling Google APIs on behalf of a user
+
+    Raises:
+        AccessTokenUnavailable: If no token can be obtained
+    """
+    return await access_token_cache.get(user_id)
@@ -0,0 +1,152 @@
+import math
+import secrets
+import time
+from typing import Any, Dict, List, Optional
+
+from app.auth.crypto_executor import COST_HMAC_PER_TOKEN, crypto_executor
+from app.auth.jwt import verify_token
+from app.auth.session_store import is_opaque_session_id, session_store
+from app.config import settings
+from app.db.database import get_db
+from app.log import stage
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+router = APIRouter(prefix="/oauth", tags=["introspection"])
+
+# Internal callers authenticate with a shared bearer secret
+introspection_auth = HTTPBearer(auto_error=False)
+
+
+class IntrospectionRequest(BaseModel):
+    tokens: List[str]
+
+
+def _claims_to_result(claims: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shape verified claims as an RFC 7662 introspection response entry"""
+    if claims is None:
+        return {"active": False}
+
+    result = {"active": True, "token_type": "session"}
+    for claim in ("sub", "email", "role", "exp", "iat", "jti"):
+        if claims.get(claim) is not None:
+            result[claim] = claims[claim]
+    return result
+
+
+def introspect_jwt(token: str) -> Dict[str, Any]:
+    """
+    Introspect a session JWT
+
+    Args:
+        token: Session JWT to verify
+
+    Returns:
+        Introspection result, {"active": False} if the token is invalid or expired
+    """
+    try:
+        return _claims_to_result(verify_token(token))
+    except HTTPException:
+        return {"active": False}
+
+
+def _introspect_jwt_chunk(tokens: List[str]) -> List[Dict[str, Any]]:
+    return [introspect_jwt(token) for token in tokens]
+
+
+async def _introspect_jwts(tokens: List[str]) -> List[Dict[str, Any]]:
+    """
+    Verify JWTs inline, or off the event loop for larger batches
+
+    HS256 verification holds the GIL, so splitting a batch across threads
+    doesn't verify faster; the batch goes to the crypto executor as a whole
+    so it doesn't stall other requests on the event loop.
+    """
+    return await crypto_executor.run(
+        _introspect_jwt_chunk, tokens, cost=len(tokens) * COST_HMAC_PER_TOKEN
+    )
+
+
+def _offload_at() -> int:
+    """Batch size from which the crypto executor offloads JWT verification"""
+    return max(1, math.ceil(crypto_executor.offload_threshold_us / COST_HMAC_PER_TOKEN))
+
+
+def cache_max_age(results: List[Dict[str, Any]], now: Optional[float] = None) -> int:
+    """
+    Compute how long a batch response may be cached
+
+    The response must not outlive any active token in it, so the max-age is
+    the smallest remaining lifetime, capped by INTROSPECTION_MAX_CACHE_SECONDS.
+    Inactive results never become active again and don't lower the bound.
+    """
+    now = now if now is not None else time.time()
+    max_age = settings.INTROSPECTION_MAX_CACHE_SECONDS
+    for result in results:
+        if result["active"] and "exp" in result:
+            max_age = min(max_age, int(result["exp"] - now))
+    return max(max_age, 0)
+
+
+@router.post("/introspect")
+async def introspect(
+    body: IntrospectionRequest,
+    response: Response,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(introspection_auth),
+    db: Session = Depends(get_db),
+):
+    """
+    Batch token introspection for internal services (RFC 7662 style)
+
+    - Authenticates the caller with the INTROSPECTION_SECRET bearer token
+    - Verifies every token in one pass, off the event loop for large batches
+    - Returns one result per token, in request order
+    - Sets Cache-Control bounded by the shortest remaining token lifetime
+    """
+    if not settings.INTROSPECTION_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Introspection is disabled",
+        )
+
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials, settings.INTROSPECTION_SECRET
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid introspection credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if len(body.tokens) > settings.INTROSPECTION_MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many tokens (max {settings.INTROSPECTION_MAX_BATCH})",
+        )
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(body.tokens)
+
+    opaque_indexes, jwt_indexes = [], []
+    for index, token in enumerate(body.tokens):
+        if is_opaque_session_id(token):
+            opaque_indexes.append(index)
+        else:
+            jwt_indexes.append(index)
+
+    with stage("verify"):
+        # Opaque sessions missing from memory are loaded in one query, off
+        # the event loop from the same batch size as JWT verification
+        sessions = await session_store.aresolve_many(
+            db, [body.tokens[i] for i in opaque_indexes], offload_at=_offload_at()
+        )
+        jwt_results = await _introspect_jwts([body.tokens[i] for i in jwt_indexes])
+    for index, claims in zip(opaque_indexes, sessions):
+        results[index] = _claims_to_result(claims)
+    for index, result in zip(jwt_indexes, jwt_results):
+        results[index] = result
+
+    response.headers["Cache-Control"] = f"private, max-age={cache_max_age(results)}"
+
+    return {"results": results}
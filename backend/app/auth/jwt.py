@@ -3,9 +3,14 @@ from datetime import datetime, timedelta
 from typing import Any, Dict, Optional
 
 import jwt
+from app.auth.crypto_executor import COST_HMAC_PER_TOKEN, crypto_executor
+from app.auth.session_store import is_opaque_session_id, session_store
 from app.config import settings
+from app.db.database import get_db, read_router
+from app.log import set_auth, stage
 from fastapi import Depends, HTTPException, status
 from fastapi.security import APIKeyCookie
+from sqlalchemy.orm import Session
 
 # Cookie-based JWT authentication
 oauth2_scheme = APIKeyCookie(name="session_token")
@@ -83,12 +88,32 @@ def verify_token(token: str) -> Dict[str, Any]:
         )
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any]:
+async def acreate_access_token(
+    data: Dict[str, Any], expires_delta: Optional[timedelta] = None
+) -> str:
+    """create_access_token for async handlers, run on the crypto executor"""
+    return await crypto_executor.run(
+        create_access_token, data, expires_delta, cost=COST_HMAC_PER_TOKEN
+    )
+
+
+async def averify_token(token: str) -> Dict[str, Any]:
+    """verify_token for async handlers, run on the crypto executor"""
+    return await crypto_executor.run(verify_token, token, cost=COST_HMAC_PER_TOKEN)
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> Dict[str, Any]:
     """
-    FastAPI dependency to get current user from JWT token
+    FastAPI dependency to get current user from the session cookie
+
+    Accepts either a session JWT or an opaque session id, so endpoints work
+    the same regardless of SESSION_MODE.
 
     Args:
-        token: JWT token extracted from cookie
+        token: JWT token or opaque session id extracted from cookie
+        db: Database session, only used for opaque session lookups
 
     Returns:
         Dict containing user information
@@ -96,8 +121,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any
     Raises:
         HTTPException: If token is invalid or user not found
     """
-    # Verify the token
-    payload = verify_token(token)
+    with stage("auth"):
+        if is_opaque_session_id(token):
+            # Resolve the opaque session id through the session store
+            payload = await session_store.aresolve(db, token)
+        else:
+            # Verify the token
+            try:
+                payload = await averify_token(token)
+            except HTTPException:
+                set_auth("invalid")
+                raise
+
+    if payload is None:
+        set_auth("invalid")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid session",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    set_auth("ok", payload.get("sub"))
 
     # Return user ID and role
     return {
@@ -105,3 +148,30 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any
         "role": payload.get("role", "user"),
         "email": payload.get("email"),
     }
+
+
+async def require_admin(
+    current_user: Dict[str, Any] = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """
+    FastAPI dependency restricting an endpoint to the "admin" role claim
+
+    Raises:
+        HTTPException: If the current user is not an admin
+    """
+    if current_user["role"] != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin role required",
+        )
+    return current_user
+
+
+def get_user_read_db(current_user: Dict[str, Any] = Depends(get_current_user)):
+    """
+    FastAPI dependency to get a read-only session for the current user
+
+    Reads go to a replica, except right after the user's own write, when
+    they stick to the primary so the user sees it.
+    """
+    yield from read_router.session(sticky_key=current_user["user_id"])
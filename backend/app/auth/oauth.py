@@ -1,35 +1,183 @@
+import asyncio
+import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from urllib.parse import urlencode
 
-import requests
-from app.auth.jwt import create_access_token
+from app.auth.callback_dedup import callback_deduplicator, callback_key
+from app.auth.crypto_executor import (
+    aread_refresh_token,
+    aseal_refresh_token,
+    averify_id_token,
+)
+from app.auth.google_tokens import access_token_cache
+from app.auth.jwt import acreate_access_token
+from app.auth.providers import OIDCProvider, get_provider
+from app.auth.session_store import is_opaque_session_id, session_store
 from app.auth.utils import (
     create_auth_cookies,
-    encrypt_refresh_token,
     generate_nonce,
     generate_state,
-    verify_id_token,
 )
 from app.config import settings
-from app.db.database import get_db
+from app.db.audit import audit_writer
+from app.db.database import get_db, read_router
+from app.db.last_login import last_login_tracker
+from app.log import set_auth, stage
+from app.models.identity import UserIdentity
 from app.models.user import User
-from fastapi import APIRouter, Cookie, Depends, HTTPException, Response, status
+from fastapi import (
+    APIRouter,
+    Cookie,
+    Depends,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
 from sqlalchemy.orm import Session
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/oauth", tags=["oauth"])
 
 
+def _resolve_provider(name: str) -> OIDCProvider:
+    provider = get_provider(name)
+    if provider is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown identity provider: {name}",
+        )
+    return provider
+
+
+def _redirect_uri(provider: OIDCProvider) -> str:
+    """Google keeps the originally registered redirect URI"""
+    if provider.name == "google":
+        return f"{settings.BASE_URL}/oauth2/callback"
+    return (
+        f"{settings.BASE_URL}/oauth2/callback?{urlencode({'provider': provider.name})}"
+    )
+
+
+def _update_profile(
+    user: User, email: str, name: Optional[str], picture: Optional[str]
+) -> bool:
+    """
+    Copy profile claims onto the user, touching only fields that changed
+
+    Assigning an unchanged value still marks the row dirty, which would issue
+    an UPDATE and bump updated_at on every login.
+
+    Returns:
+        True if any field changed
+    """
+    changed = False
+    for field, value in (("email", email), ("name", name), ("picture", picture)):
+        if getattr(user, field) != value:
+            setattr(user, field, value)
+            changed = True
+    return changed
+
+
+async def _store_refresh_token(user: User, refresh_token: str) -> None:
+    """Encrypt and store a refresh token unless the same one is already stored"""
+    try:
+        current = await aread_refresh_token(user)
+    except Exception:
+        # Undecryptable (e.g. rotated key): overwrite it
+        current = None
+    if current == refresh_token:
+        return
+
+    # Calculate token expiration (usually 6 months for Google)
+    refresh_token_expires_at = datetime.utcnow() + timedelta(days=180)
+
+    # Encrypt the refresh token
+    user.refresh_token_envelope = await aseal_refresh_token(refresh_token)
+
+    # Clear the legacy base64 format
+    user.encrypted_refresh_token = None
+    user.refresh_token_iv = None
+    user.refresh_token_tag = None
+    user.refresh_token_expires_at = refresh_token_expires_at
+
+
+def _find_or_create_user(
+    db: Session,
+    provider: OIDCProvider,
+    subject: str,
+    email: str,
+    email_verified: bool,
+    name: Optional[str],
+    picture: Optional[str],
+) -> User:
+    """
+    Find the user linked to a provider subject, linking or creating one if needed
+
+    An existing account is only linked by email when the provider asserts the
+    email is verified; otherwise anyone could claim an account by registering
+    its address with another provider.
+    """
+    identity = (
+        db.query(UserIdentity)
+        .filter(UserIdentity.provider == provider.name, UserIdentity.subject == subject)
+        .first()
+    )
+    if identity:
+        # Update existing user
+        user = db.get(User, identity.user_id)
+        _update_profile(user, email, name, picture)
+        return user
+
+    user = None
+    if provider.name == "google":
+        # Google accounts created before identities were tracked
+        user = db.query(User).filter(User.google_id == subject).first()
+
+    if user is None:
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None and not email_verified:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="An account with this email already exists",
+            )
+
+    if user is None:
+        # Create new user
+        user = User(
+            email=email,
+            google_id=subject if provider.name == "google" else None,
+            name=name,
+            picture=picture,
+        )
+        db.add(user)
+        db.flush()
+    else:
+        # Update existing user
+        _update_profile(user, email, name, picture)
+
+    db.add(UserIdentity(user_id=user.id, provider=provider.name, subject=subject))
+    return user
+
+
 @router.get("/authorize")
-async def authorize(response: Response, db: Session = Depends(get_db)):
+async def authorize(
+    response: Response, provider: str = "google", db: Session = Depends(get_db)
+):
     """
-    Redirect to Google's OAuth authorization endpoint
+    Redirect to the identity provider's OAuth authorization endpoint
 
+    - Resolves the provider (default "google") through the provider registry
     - Generates a state parameter and stores it in a cookie for CSRF protection
     - Generates a nonce parameter for PKCE
     - Builds the authorization URL with required parameters
-    - Returns a 302 redirect to Google's authorization page
+    - Returns a 302 redirect to the provider's authorization page
     """
+    oidc_provider = _resolve_provider(provider)
+
     # Generate state and nonce
     state = generate_state()
     nonce = generate_nonce()
@@ -58,62 +206,45 @@ async def authorize(response: Response, db: Session = Depends(get_db)):
 
     # Build authorization URL
     params = {
-        "client_id": settings.GOOGLE_CLIENT_ID,
-        "redirect_uri": f"{settings.BASE_URL}/oauth2/callback",
+        "client_id": oidc_provider.client_id,
+        "redirect_uri": _redirect_uri(oidc_provider),
         "response_type": "code",
-        "scope": "openid email profile",
-        "access_type": "offline",  # For refresh token
-        "prompt": "consent",  # Always ask for consent to ensure we get refresh token
+        "scope": oidc_provider.scopes,
         "state": state,
         "nonce": nonce,
     }
+    if oidc_provider.name == "google":
+        params["access_type"] = "offline"  # For refresh token
+        params["prompt"] = "consent"  # Always ask for consent to get refresh token
 
-    auth_url = f"{settings.GOOGLE_AUTH_URL}?{urlencode(params)}"
+    # May fetch the discovery document; one slow provider mustn't stall the
+    # event loop for the others
+    auth_url = await asyncio.to_thread(oidc_provider.authorization_url, params)
 
-    # Redirect to Google's auth page
+    # Redirect to the provider's auth page
     response.status_code = status.HTTP_302_FOUND
     response.headers["Location"] = auth_url
 
-    return {"message": "Redirecting to Google for authentication"}
+    return {"message": f"Redirecting to {oidc_provider.name} for authentication"}
 
 
-@router.get("/oauth2/callback")
-async def oauth_callback(
-    code: str,
-    state: str,
-    response: Response,
-    oauth_state: Optional[str] = Cookie(None),
-    oauth_nonce: Optional[str] = Cookie(None),
-    db: Session = Depends(get_db),
-):
+async def _complete_login(
+    db: Session, oidc_provider: OIDCProvider, code: str, oauth_nonce: Optional[str]
+) -> Tuple[int, str]:
     """
-    Handle the OAuth callback from Google
+    Run the code exchange, ID token checks and user upsert for a callback
 
-    - Validates the state parameter against the cookie
-    - Exchanges the authorization code for tokens
-    - Verifies the ID token
-    - Upserts the user in the database
-    - Creates a session JWT token and sets it as a cookie
-    - Encrypts and stores the refresh token in the database
-    - Redirects to the frontend homepage
-    """
-    # Validate state to prevent CSRF
-    if not oauth_state or oauth_state != state:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid state parameter"
-        )
+    Returns:
+        Tuple of (user_id, session_token)
 
+    Raises:
+        HTTPException: If any step of the login fails
+    """
     # Exchange authorization code for tokens
-    token_response = requests.post(
-        settings.GOOGLE_TOKEN_URL,
-        data={
-            "code": code,
-            "client_id": settings.GOOGLE_CLIENT_ID,
-            "client_secret": settings.GOOGLE_CLIENT_SECRET,
-            "redirect_uri": f"{settings.BASE_URL}/oauth2/callback",
-            "grant_type": "authorization_code",
-        },
-    )
+    with stage("token_exchange"):
+        token_response = await asyncio.to_thread(
+            oidc_provider.exchange_code, code, _redirect_uri(oidc_provider)
+        )
 
     if token_response.status_code != 200:
         raise HTTPException(
@@ -136,7 +267,10 @@ async def oauth_callback(
 
     # Verify ID token
     try:
-        id_token_payload = verify_id_token(id_token)
+        with stage("id_token"):
+            id_token_payload = await averify_id_token(
+                id_token, provider=oidc_provider.name
+            )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -151,56 +285,154 @@ async def oauth_callback(
 
     # Extract user info from ID token
     user_email = id_token_payload.get("email")
-    google_id = id_token_payload.get("sub")
+    subject = id_token_payload.get("sub")
     name = id_token_payload.get("name")
     picture = id_token_payload.get("picture")
 
-    if not user_email or not google_id:
+    if not user_email or not subject:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Missing required user information in ID token",
         )
 
-    # Find or create user
-    user = db.query(User).filter(User.google_id == google_id).first()
+    with stage("db"):
+        # Find or create user
+        user = _find_or_create_user(
+            db,
+            oidc_provider,
+            subject=subject,
+            email=user_email,
+            email_verified=id_token_payload.get("email_verified") is True,
+            name=name,
+            picture=picture,
+        )
 
-    if not user:
-        # Create new user
-        user = User(email=user_email, google_id=google_id, name=name, picture=picture)
-        db.add(user)
-    else:
-        # Update existing user
-        user.email = user_email
-        user.name = name
-        user.picture = picture
-
-    # Store encrypted refresh token if provided
-    if refresh_token:
-        # Calculate token expiration (usually 6 months for Google)
-        refresh_token_expires_at = datetime.utcnow() + timedelta(days=180)
-
-        # Encrypt the refresh token
-        encrypted_token, token_iv, token_tag = encrypt_refresh_token(refresh_token)
-
-        user.encrypted_refresh_token = encrypted_token
-        user.refresh_token_iv = token_iv
-        user.refresh_token_tag = token_tag
-        user.refresh_token_expires_at = refresh_token_expires_at
-
-    # Commit user to database
-    db.commit()
-    db.refresh(user)
-
-    # Create JWT for session
-    jwt_data = {
-        "sub": str(user.id),
-        "email": user.email,
-        "role": "user",
-        "name": user.name,
-        "picture": user.picture,
-    }
+        # Store encrypted refresh token if provided (the columns hold Google's)
+        if refresh_token and oidc_provider.name == "google":
+            await _store_refresh_token(user, refresh_token)
+
+        # Commit user to database, skipping the round trip for returning users
+        # whose profile and refresh token are unchanged
+        if db.new or db.dirty:
+            db.commit()
+            db.refresh(user)
+            # Replicas may lag; serve this user's reads from the primary for now
+            read_router.mark_written(str(user.id))
+
+    # last_login_at is written in periodic batches, not per login
+    last_login_tracker.touch(user.id)
+
+    # Keep Google's access token so Google API calls don't need a refresh
+    if oidc_provider.name == "google":
+        access_token_cache.put(user.id, access_token, token_data.get("expires_in"))
+
+    with stage("session"):
+        if settings.SESSION_MODE == "opaque":
+            # Short opaque id in the cookie, claims stay server-side
+            session_token = await session_store.acreate(
+                db,
+                user_id=user.id,
+                email=user.email,
+                role="user",
+                name=user.name,
+                picture=user.picture,
+            )
+        else:
+            # Create JWT for session
+            jwt_data = {
+                "sub": str(user.id),
+                "email": user.email,
+                "role": "user",
+                "name": user.name,
+                "picture": user.picture,
+            }
+
+            session_token = await acreate_access_token(jwt_data)
+
+    return user.id, session_token
+
+
+async def _record_login(
+    request: Request,
+    oidc_provider: OIDCProvider,
+    started: float,
+    outcome: str,
+    user_id: Optional[int] = None,
+    detail: Optional[str] = None,
+) -> None:
+    """Queue a login audit event; never blocks the callback on the database"""
+    set_auth(outcome, user_id)
+    await audit_writer.arecord(
+        user_id=user_id,
+        provider=oidc_provider.name,
+        ip=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent"),
+        outcome=outcome,
+        detail=detail,
+        latency_ms=int((time.perf_counter() - started) * 1000),
+    )
+
+
+@router.get("/oauth2/callback")
+async def oauth_callback(
+    request: Request,
+    code: str,
+    state: str,
+    response: Response,
+    provider: str = "google",
+    oauth_state: Optional[str] = Cookie(None),
+    oauth_nonce: Optional[str] = Cookie(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Handle the OAuth callback from the identity provider
 
-    session_token = create_access_token(jwt_data)
+    - Resolves the provider (default "google") through the provider registry
+    - Validates the state parameter against the cookie
+    - Deduplicates repeated callbacks for the same code (see callback_dedup)
+    - Exchanges the authorization code for tokens
+    - Verifies the ID token
+    - Upserts the user in the database
+    - Creates a session (JWT or opaque id, per SESSION_MODE) and sets it as a cookie
+    - Encrypts and stores the Google refresh token in the database
+    - Queues a login audit event with the outcome and latency
+    - Redirects to the frontend homepage
+    """
+    oidc_provider = _resolve_provider(provider)
+
+    started = time.perf_counter()
+    try:
+        # Validate state to prevent CSRF
+        if not oauth_state or oauth_state != state:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid state parameter",
+            )
+
+        # Browser retries and double submits reuse the code; only the first
+        # one is exchanged, the others get its result
+        (user_id, session_token), duplicate = await callback_deduplicator.run(
+            callback_key(oidc_provider.name, code, oauth_nonce),
+            lambda: _complete_login(db, oidc_provider, code, oauth_nonce),
+        )
+    except HTTPException as exc:
+        await _record_login(
+            request, oidc_provider, started, "failure", detail=exc.detail
+        )
+        raise
+    except Exception as exc:
+        logger.exception("OAuth callback failed for provider %s", oidc_provider.name)
+        await _record_login(request, oidc_provider, started, "error", detail=repr(exc))
+        raise
+
+    await _record_login(
+        request,
+        oidc_provider,
+        started,
+        "success",
+        user_id=user_id,
+        detail="duplicate callback" if duplicate else None,
+    )
 
     # Clear OAuth cookies
     response.delete_cookie(key="oauth_state", path="/oauth2/callback")
@@ -218,4 +450,24 @@ async def oauth_callback(
     return {"message": "Authentication successful"}
 
 
+@router.post("/logout")
+async def logout(
+    response: Response,
+    session_token: Optional[str] = Cookie(None),
+    db: Session = Depends(get_db),
+):
+    """
+    End the current session
+
+    - Revokes an opaque session server-side so it can't be replayed
+    - Clears the session cookie (a session JWT simply stops being sent)
+    """
+    if session_token and is_opaque_session_id(session_token):
+        await session_store.arevoke(db, session_token)
+
+    response.delete_cookie(key="session_token", path="/", domain=settings.COOKIE_DOMAIN)
+
+    return {"message": "Logged out"}
+
+
 # https://support.google.com/cloud/answer/15549257?hl=ko&visit_id=638819651878336340-597981199&rd=1#zippy=%2Cnative-applications-android-ios-desktop-uwp-chrome-extensions-tv-and-limited-input%2Cweb-applications
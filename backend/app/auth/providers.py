@@ -0,0 +1,429 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import urlencode
+
+import jwt
+import requests
+from app.cache import SharedCache, shared_cache
+from app.config import settings
+from requests.adapters import HTTPAdapter
+
+# Endpoints a provider must expose for the authorization code flow
+REQUIRED_METADATA = ("authorization_endpoint", "token_endpoint", "jwks_uri")
+
+# Shared cache namespace, keyed by JWKS URI
+JWKS_NAMESPACE = "jwks"
+
+
+class ProviderMetrics:
+    """Per-provider counters, kept separate so one provider can't mask another"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, float] = {
+            "discovery_fetches": 0,
+            "jwks_fetches": 0,
+            "jwks_hits": 0,
+            "jwks_shared_hits": 0,
+            "jwks_unknown_kid": 0,
+            "token_requests": 0,
+            "token_errors": 0,
+            "token_seconds_total": 0.0,
+        }
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.counters)
+
+
+class OIDCProvider:
+    """
+    OpenID Connect provider
+
+    Metadata comes from the provider's `.well-known/openid-configuration`
+    document and is cached for OIDC_DISCOVERY_TTL_SECONDS; JWKS are cached for
+    OIDC_JWKS_TTL_SECONDS. Fetched JWKS are also published to the shared
+    cache, so other nodes pick them up without fetching, and a node that
+    fetched rotated keys makes the others reload theirs. Each provider has
+    its own HTTP session, so its connection pool and keep-alive connections
+    aren't shared with other providers.
+
+    Args:
+        name: Registry name, e.g. "google"
+        issuer: Issuer URL; also the base of the discovery document
+        client_id: OAuth client ID, used as the ID token audience
+        client_secret: OAuth client secret
+        scopes: Space separated scopes requested at authorization
+        metadata: Static metadata merged over discovery. If it contains
+            every REQUIRED_METADATA endpoint, discovery is never fetched
+        issuers: Accepted `iss` values, defaults to [issuer]
+        cache: Cache for sharing JWKS across nodes, defaults to shared_cache
+    """
+
+    def __init__(
+        self,
+        name: str,
+        issuer: str,
+        client_id: Optional[str],
+        client_secret: Optional[str],
+        scopes: str = "openid email profile",
+        metadata: Optional[Dict[str, str]] = None,
+        issuers: Optional[List[str]] = None,
+        cache: Optional[SharedCache] = None,
+    ):
+        self.name = name
+        self.issuer = issuer.rstrip("/")
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scopes = scopes
+        self.issuers = issuers or [self.issuer]
+        self.metrics = ProviderMetrics()
+        self.cache = cache if cache is not None else shared_cache
+
+        self._static_metadata = metadata or {}
+        self._metadata: Optional[Dict[str, Any]] = None
+        self._metadata_expires = 0.0
+        self._jwks: Dict[str, Dict[str, Any]] = {}
+        self._jwks_expires = 0.0
+        self._jwks_uri: Optional[str] = None
+        # Parsed form of the JWKS keys, so verifications don't re-parse them
+        self._parsed_keys: Dict[str, jwt.PyJWK] = {}
+        self._metadata_lock = threading.Lock()
+        self._jwks_lock = threading.Lock()
+
+        # Dedicated connection pool for this provider
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.OIDC_HTTP_POOL_SIZE
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Keys fetched by other nodes, e.g. after a rotation
+        self.cache.on_invalidate(JWKS_NAMESPACE, self._on_jwks_invalidated)
+
+    @property
+    def discovery_url(self) -> str:
+        return f"{self.issuer}/.well-known/openid-configuration"
+
+    def metadata(self) -> Dict[str, Any]:
+        """
+        Get provider metadata, fetching discovery only when the cache is stale
+
+        Returns:
+            Discovery document with static metadata applied on top
+        """
+        if all(key in self._static_metadata for key in REQUIRED_METADATA):
+            return self._static_metadata
+
+        if self._metadata is not None and time.monotonic() < self._metadata_expires:
+            return self._metadata
+
+        with self._metadata_lock:
+            # Another thread may have refreshed while we waited
+            if self._metadata is None or time.monotonic() >= self._metadata_expires:
+                response = self.session.get(
+                    self.discovery_url, timeout=settings.OIDC_HTTP_TIMEOUT_SECONDS
+                )
+                response.raise_for_status()
+                self.metrics.incr("discovery_fetches")
+                self._metadata = {**response.json(), **self._static_metadata}
+                self._metadata_expires = (
+                    time.monotonic() + settings.OIDC_DISCOVERY_TTL_SECONDS
+                )
+            return self._metadata
+
+    def _on_jwks_invalidated(self, jwks_uri: str) -> None:
+        if jwks_uri == self._jwks_uri:
+            # The next lookup loads the new keys from the shared cache
+            self._jwks_expires = 0.0
+
+    def _fetch_jwks(self, jwks_uri: str, use_shared: bool = True) -> bool:
+        """
+        Load the JWKS, from the shared cache when another node fetched it
+
+        Must be called with the JWKS lock held.
+
+        Returns:
+            True if the keys came from the shared cache
+        """
+        self._jwks_uri = jwks_uri
+        if use_shared:
+            keys = self.cache.get(JWKS_NAMESPACE, jwks_uri)
+            if keys is not None:
+                self.metrics.incr("jwks_shared_hits")
+                self._jwks = keys
+                self._parsed_keys = {}
+                self._jwks_expires = time.monotonic() + settings.OIDC_JWKS_TTL_SECONDS
+                return True
+
+        response = self.session.get(
+            jwks_uri, timeout=settings.OIDC_HTTP_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        self.metrics.incr("jwks_fetches")
+        self._jwks = {key["kid"]: key for key in response.json().get("keys", [])}
+        self._parsed_keys = {}
+        self._jwks_expires = time.monotonic() + settings.OIDC_JWKS_TTL_SECONDS
+        self.cache.set(
+            JWKS_NAMESPACE, jwks_uri, self._jwks, settings.OIDC_JWKS_TTL_SECONDS
+        )
+        return False
+
+    def jwks(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the provider's signing keys
+
+        Returns:
+            Mapping of key ID to JWK
+        """
+        if self._jwks and time.monotonic() < self._jwks_expires:
+            self.metrics.incr("jwks_hits")
+            return self._jwks
+
+        # Resolve discovery first; it has its own lock
+        jwks_uri = self.metadata()["jwks_uri"]
+        with self._jwks_lock:
+            if not self._jwks or time.monotonic() >= self._jwks_expires:
+                self._fetch_jwks(jwks_uri)
+            return self._jwks
+
+    def signing_key(self, kid: str) -> Dict[str, Any]:
+        """
+        Look up the JWK for a key ID
+
+        An unknown kid usually means the provider rotated keys, so the JWKS is
+        re-fetched once before giving up.
+
+        Raises:
+            ValueError: If no key matches
+        """
+        keys = self.jwks()
+        if kid in keys:
+            return keys[kid]
+
+        self.metrics.incr("jwks_unknown_kid")
+        jwks_uri = self.metadata()["jwks_uri"]
+        with self._jwks_lock:
+            # Another node may already have fetched the rotated keys; if its
+            # copy lacks the kid too, go to the provider
+            if kid not in self._jwks and self._fetch_jwks(jwks_uri):
+                if kid not in self._jwks:
+                    self._fetch_jwks(jwks_uri, use_shared=False)
+            if kid in self._jwks:
+                return self._jwks[kid]
+
+        raise ValueError("Invalid token: no matching key found")
+
+    def parsed_signing_key(self, kid: str) -> jwt.PyJWK:
+        """
+        Look up the parsed key for a key ID, parsing it on first use
+
+        Raises:
+            ValueError: If no key matches
+        """
+        # Goes through jwks() so expired keys are still re-fetched; a re-fetch
+        # clears the parsed keys
+        keys = self.jwks()
+        parsed = self._parsed_keys.get(kid)
+        if parsed is None:
+            parsed = jwt.PyJWK(keys[kid] if kid in keys else self.signing_key(kid))
+            self._parsed_keys[kid] = parsed
+        return parsed
+
+    def parse_signing_keys(self) -> None:
+        """Fetch the JWKS if needed and parse every key ahead of first use"""
+        for kid in self.jwks():
+            self.parsed_signing_key(kid)
+
+    def authorization_url(self, params: Dict[str, str]) -> str:
+        """Build the authorization URL for the given query parameters"""
+        return f"{self.metadata()['authorization_endpoint']}?{urlencode(params)}"
+
+    def _token_request(self, data: Dict[str, str]) -> requests.Response:
+        started = time.perf_counter()
+        self.metrics.incr("token_requests")
+        try:
+            response = self.session.post(
+                self.metadata()["token_endpoint"],
+                data={
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    **data,
+                },
+                timeout=settings.OIDC_HTTP_TIMEOUT_SECONDS,
+            )
+        except requests.RequestException:
+            self.metrics.incr("token_errors")
+            raise
+        finally:
+            self.metrics.incr("token_seconds_total", time.perf_counter() - started)
+
+        if response.status_code != 200:
+            self.metrics.incr("token_errors")
+        return response
+
+    def exchange_code(self, code: str, redirect_uri: str) -> requests.Response:
+        """
+        Exchange an authorization code at the token endpoint
+
+        Returns:
+            The raw token endpoint response
+        """
+        return self._token_request(
+            {
+                "code": code,
+                "redirect_uri": redirect_uri,
+                "grant_type": "authorization_code",
+            }
+        )
+
+    def refresh_access_token(self, refresh_token: str) -> requests.Response:
+        """
+        Get a new access token with a refresh token
+
+        Returns:
+            The raw token endpoint response
+        """
+        return self._token_request(
+            {"refresh_token": refresh_token, "grant_type": "refresh_token"}
+        )
+
+    def verify_id_token(self, id_token: str) -> Dict[str, Any]:
+        """
+        Verify an ID token against the provider's cached JWKS
+
+        Args:
+            id_token: The ID token to verify
+
+        Returns:
+            The decoded token payload if valid
+
+        Raises:
+            ValueError: If no signing key matches or the issuer is wrong
+            jwt.PyJWTError: If the signature, audience or expiry is invalid
+        """
+        return decode_id_token(
+            id_token, self.key_for_token(id_token), self.client_id, self.issuers
+        )
+
+    def key_for_token(self, id_token: str, parsed: bool = True) -> Any:
+        """
+        Get the key that signed a token, from its unverified `kid` header
+
+        Args:
+            id_token: The ID token
+            parsed: Return the cached parsed key; False returns the JWK
+                dict, e.g. to send to another process
+
+        Raises:
+            ValueError: If no signing key matches
+        """
+        kid = jwt.get_unverified_header(id_token).get("kid")
+        if not kid:
+            raise ValueError("Invalid token: no matching key found")
+        if parsed:
+            return self.parsed_signing_key(kid)
+        return self.signing_key(kid)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics.snapshot(),
+            "jwks_keys": len(self._jwks),
+            "parsed_keys": len(self._parsed_keys),
+            "discovery_cached": self._metadata is not None,
+        }
+
+
+def decode_id_token(
+    id_token: str,
+    jwk: Union[jwt.PyJWK, Dict[str, Any]],
+    audience: Optional[str],
+    issuers: List[str],
+) -> Dict[str, Any]:
+    """
+    Verify an ID token's RS256 signature and claims against a JWK
+
+    Pure function of its arguments, so it can run in a worker process. In
+    this process callers pass the provider's cached parsed key; parsed keys
+    can't be pickled, so a worker process gets the JWK dict and parses it.
+
+    Raises:
+        ValueError: If the issuer is not accepted
+        jwt.PyJWTError: If the signature, audience or expiry is invalid
+    """
+    payload = jwt.decode(
+        id_token,
+        (jwk if isinstance(jwk, jwt.PyJWK) else jwt.PyJWK(jwk)).key,
+        algorithms=["RS256"],
+        audience=audience,
+        options={"verify_exp": True},
+    )
+
+    if payload.get("iss") not in issuers:
+        raise ValueError("Invalid token: unexpected issuer")
+
+    return payload
+
+
+# Provider registry
+_providers: Dict[str, OIDCProvider] = {}
+
+
+def register_provider(provider: OIDCProvider) -> None:
+    """Add or replace a provider in the registry"""
+    _providers[provider.name] = provider
+
+
+def get_provider(name: str) -> Optional[OIDCProvider]:
+    """
+    Get a registered provider
+
+    Returns:
+        The provider, or None if no provider is registered under `name`
+    """
+    return _providers.get(name)
+
+
+def all_providers() -> List[OIDCProvider]:
+    return list(_providers.values())
+
+
+def load_providers() -> None:
+    """Register Google plus every provider configured in OIDC_PROVIDERS"""
+    # Google keeps its configured endpoints, so it never needs discovery
+    register_provider(
+        OIDCProvider(
+            name="google",
+            issuer=settings.GOOGLE_ISSUER,
+            client_id=settings.GOOGLE_CLIENT_ID,
+            client_secret=settings.GOOGLE_CLIENT_SECRET,
+            metadata={
+                "authorization_endpoint": settings.GOOGLE_AUTH_URL,
+                "token_endpoint": settings.GOOGLE_TOKEN_URL,
+                "userinfo_endpoint": settings.GOOGLE_USERINFO_URL,
+                "jwks_uri": settings.GOOGLE_CERTS_URL,
+            },
+            # Google issues ID tokens with and without the scheme
+            issuers=["https://accounts.google.com", "accounts.google.com"],
+        )
+    )
+
+    for name, config in settings.OIDC_PROVIDERS.items():
+        register_provider(
+            OIDCProvider(
+                name=name,
+                issuer=config["issuer"],
+                client_id=config.get("client_id"),
+                client_secret=config.get("client_secret"),
+                scopes=config.get("scopes", "openid email profile"),
+            )
+        )
+
+
+load_providers()
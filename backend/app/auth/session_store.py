@@ -0,0 +1,509 @@
+import asyncio
+import hashlib
+import logging
+import math
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.cache import SharedCache, shared_cache
+from app.config import settings
+from app.models.session import UserSession
+from sqlalchemy.orm import Session
+
+
+class SessionRecord:
+    """In-memory view of a session row
+
+    Uses __slots__ so a cached session costs a handful of pointers instead of a
+    per-instance __dict__.
+    """
+
+    __slots__ = ("user_id", "email", "role", "name", "picture", "expires_at", "slot")
+
+    def __init__(
+        self,
+        user_id: str,
+        email: Optional[str],
+        role: str,
+        name: Optional[str],
+        picture: Optional[str],
+        expires_at: float,
+    ):
+        self.user_id = user_id
+        self.email = email
+        self.role = role
+        self.name = name
+        self.picture = picture
+        self.expires_at = expires_at
+        self.slot = -1
+
+    def to_claims(self) -> Dict[str, Any]:
+        """Return the record in the same shape as a decoded session JWT"""
+        return {
+            "sub": self.user_id,
+            "email": self.email,
+            "role": self.role,
+            "name": self.name,
+            "picture": self.picture,
+            "exp": int(self.expires_at),
+        }
+
+
+class TimingWheel:
+    """
+    Hashed timing wheel for session expiry
+
+    Each slot covers `tick_seconds`; a key is placed in the slot its expiry
+    falls into. Advancing the wheel only visits the slots that elapsed since
+    the last advance, so expiry costs O(expired) instead of a full scan.
+    Keys expiring more than one revolution ahead share a slot with nearer
+    keys and are simply re-checked by the caller.
+    """
+
+    def __init__(self, tick_seconds: int, size: int, now: Optional[float] = None):
+        self.tick_seconds = tick_seconds
+        self._slots: List[Set[str]] = [set() for _ in range(size)]
+        now = now if now is not None else time.time()
+        self._current_tick = int(now // tick_seconds)
+
+    def schedule(self, key: str, expires_at: float) -> int:
+        tick = max(int(expires_at // self.tick_seconds), self._current_tick)
+        slot = tick % len(self._slots)
+        self._slots[slot].add(key)
+        return slot
+
+    def cancel(self, key: str, slot: int) -> None:
+        if slot >= 0:
+            self._slots[slot].discard(key)
+
+    def advance(self, now: float) -> List[str]:
+        """
+        Move the wheel up to `now`
+
+        Returns:
+            Keys from every slot that elapsed; callers must check the real
+            expiry because a slot can also hold keys from later revolutions
+        """
+        now_tick = int(now // self.tick_seconds)
+        elapsed = min(now_tick - self._current_tick, len(self._slots))
+        candidates: List[str] = []
+        for offset in range(elapsed):
+            slot = (self._current_tick + 1 + offset) % len(self._slots)
+            if self._slots[slot]:
+                candidates.extend(self._slots[slot])
+                self._slots[slot].clear()
+        self._current_tick = max(now_tick, self._current_tick)
+        return candidates
+
+
+logger = logging.getLogger(__name__)
+
+
+def hash_session_id(session_id: str) -> str:
+    """Hash an opaque session id for storage so a table dump can't be replayed"""
+    return hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+
+
+# Shared cache namespace, keyed by hashed session id
+SESSION_NAMESPACE = "sessions"
+
+
+def is_opaque_session_id(token: str) -> bool:
+    """Opaque session ids are URL-safe base64 without the dots of a JWT"""
+    return "." not in token
+
+
+class SessionStore:
+    """
+    Opaque session store
+
+    Sessions are persisted in the `user_sessions` table and cached in a
+    bounded LRU of SessionRecord objects. The table is the source of truth:
+    entries dropped from memory by the size bound are reloaded on the next
+    lookup.
+
+    Sessions are also kept in the "sessions" namespace of the shared cache,
+    so a node that hasn't seen a session skips the table lookup, and a
+    revocation evicts the session from every node's LRU.
+
+    Async handlers use `acreate`, `aresolve` and `arevoke`, which keep the
+    table and shared cache I/O off the event loop; an LRU hit is still
+    answered inline.
+
+    Args:
+        max_entries: Maximum sessions cached in memory
+        tick_seconds: Timing wheel resolution
+        ttl_seconds: Default session lifetime, sizes the timing wheel
+        clock: Wall clock, injectable for tests
+        cache: Cache shared across nodes, defaults to shared_cache
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        tick_seconds: int,
+        ttl_seconds: int,
+        clock: Callable[[], float] = time.time,
+        cache: Optional[SharedCache] = None,
+    ):
+        self.max_entries = max_entries
+        self._clock = clock
+        self.cache = cache if cache is not None else shared_cache
+        self._records: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        self._wheel = TimingWheel(
+            tick_seconds,
+            max(8, math.ceil(ttl_seconds / tick_seconds) + 1),
+            now=clock(),
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        # Revocations on other nodes
+        self.cache.on_invalidate(SESSION_NAMESPACE, self.evict)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _utcnow(self) -> datetime:
+        # Naive UTC, matching the DateTime columns
+        return datetime.fromtimestamp(self._clock(), timezone.utc).replace(tzinfo=None)
+
+    def _expire(self, now: float) -> None:
+        # Must be called with the lock held
+        for key in self._wheel.advance(now):
+            record = self._records.get(key)
+            if record is None:
+                continue
+            if record.expires_at <= now:
+                del self._records[key]
+                self.expirations += 1
+            else:
+                record.slot = self._wheel.schedule(key, record.expires_at)
+
+    def _remember(self, key: str, record: SessionRecord) -> None:
+        # Must be called with the lock held
+        old = self._records.pop(key, None)
+        if old is not None:
+            self._wheel.cancel(key, old.slot)
+        record.slot = self._wheel.schedule(key, record.expires_at)
+        self._records[key] = record
+        while len(self._records) > self.max_entries:
+            evicted_key, evicted = self._records.popitem(last=False)
+            self._wheel.cancel(evicted_key, evicted.slot)
+            self.evictions += 1
+
+    def _share(self, key: str, record: SessionRecord) -> None:
+        # Absolute wall clock expiry, so other nodes can check it
+        self.cache.set(
+            SESSION_NAMESPACE,
+            key,
+            {**record.to_claims(), "exp": record.expires_at},
+            ttl_seconds=record.expires_at - self._clock(),
+        )
+
+    def evict(self, key: str) -> None:
+        """Drop a session from this node's memory, by hashed id"""
+        with self._lock:
+            record = self._records.pop(key, None)
+            if record is not None:
+                self._wheel.cancel(key, record.slot)
+
+    def create(
+        self,
+        db: Session,
+        user_id: int,
+        email: Optional[str],
+        role: str,
+        name: Optional[str],
+        picture: Optional[str],
+        expires_delta: Optional[timedelta] = None,
+    ) -> str:
+        """
+        Create a new session and persist it
+
+        Args:
+            db: Database session used to persist the row
+            user_id: ID of the authenticated user
+            email, role, name, picture: Claims returned for the session
+            expires_delta: Optional lifetime, defaults to JWT_EXPIRE_MINUTES
+
+        Returns:
+            The opaque session id to send in the cookie
+        """
+        session_id = secrets.token_urlsafe(24)
+        key = hash_session_id(session_id)
+        lifetime = expires_delta or timedelta(minutes=settings.JWT_EXPIRE_MINUTES)
+        expires_at = self._utcnow() + lifetime
+
+        db.add(
+            UserSession(
+                id=key,
+                user_id=user_id,
+                email=email,
+                role=role,
+                name=name,
+                picture=picture,
+                expires_at=expires_at,
+            )
+        )
+        db.commit()
+
+        record = SessionRecord(
+            str(user_id),
+            email,
+            role,
+            name,
+            picture,
+            self._clock() + lifetime.total_seconds(),
+        )
+        with self._lock:
+            self._remember(key, record)
+        self._share(key, record)
+
+        return session_id
+
+    async def acreate(
+        self,
+        db: Session,
+        user_id: int,
+        email: Optional[str],
+        role: str,
+        name: Optional[str],
+        picture: Optional[str],
+        expires_delta: Optional[timedelta] = None,
+    ) -> str:
+        """create for async handlers, run in a worker thread"""
+        return await asyncio.to_thread(
+            self.create, db, user_id, email, role, name, picture, expires_delta
+        )
+
+    def resolve(self, db: Session, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve an opaque session id to its claims
+
+        Args:
+            db: Database session used when the id is not cached
+            session_id: Opaque session id from the cookie
+
+        Returns:
+            Claims dict shaped like a session JWT payload, or None if the
+            session is unknown or expired
+        """
+        key = hash_session_id(session_id)
+        claims = self._lookup(key)
+        if claims is not None:
+            return claims
+        return self._load(db, key)
+
+    async def aresolve(self, db: Session, session_id: str) -> Optional[Dict[str, Any]]:
+        """resolve for async handlers; misses are loaded in a worker thread"""
+        key = hash_session_id(session_id)
+        claims = self._lookup(key)
+        if claims is not None:
+            return claims
+        return await asyncio.to_thread(self._load, db, key)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        # In-memory part of resolve, cheap enough for the event loop
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            record = self._records.get(key)
+            if record is not None and record.expires_at > now:
+                self._records.move_to_end(key)
+                self.hits += 1
+                return record.to_claims()
+            self.misses += 1
+        return None
+
+    def _load(self, db: Session, key: str) -> Optional[Dict[str, Any]]:
+        # Blocking part of resolve: the shared cache, then the table
+        now = self._clock()
+        shared = self.cache.get(SESSION_NAMESPACE, key)
+        if shared is not None and shared["exp"] > now:
+            record = SessionRecord(
+                shared["sub"],
+                shared["email"],
+                shared["role"],
+                shared["name"],
+                shared["picture"],
+                shared["exp"],
+            )
+            with self._lock:
+                self._remember(key, record)
+            return record.to_claims()
+
+        row = db.get(UserSession, key)
+        if row is None:
+            return None
+
+        remaining = (row.expires_at - self._utcnow()).total_seconds()
+        if remaining <= 0:
+            return None
+
+        record = SessionRecord(
+            str(row.user_id),
+            row.email,
+            row.role,
+            row.name,
+            row.picture,
+            now + remaining,
+        )
+        with self._lock:
+            self._remember(key, record)
+        self._share(key, record)
+
+        return record.to_claims()
+
+    def resolve_many(
+        self, db: Session, session_ids: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Resolve a batch of opaque session ids
+
+        Memory hits are answered directly; all misses are loaded with a
+        single `IN (...)` query.
+
+        Returns:
+            Claims (or None) per session id, in order
+        """
+        keys = [hash_session_id(session_id) for session_id in session_ids]
+        results, missing = self._lookup_many(keys)
+        if not missing:
+            return results
+        loaded = self._load_many(db, missing)
+        return [claims or loaded.get(key) for key, claims in zip(keys, results)]
+
+    async def aresolve_many(
+        self, db: Session, session_ids: List[str], offload_at: int = 1
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        resolve_many for async handlers
+
+        Args:
+            db: Database session used for the misses
+            session_ids: Opaque session ids
+            offload_at: Number of misses from which the table query runs in
+                a worker thread instead of on the event loop
+        """
+        keys = [hash_session_id(session_id) for session_id in session_ids]
+        results, missing = self._lookup_many(keys)
+        if not missing:
+            return results
+        if len(missing) >= offload_at:
+            loaded = await asyncio.to_thread(self._load_many, db, missing)
+        else:
+            loaded = self._load_many(db, missing)
+        return [claims or loaded.get(key) for key, claims in zip(keys, results)]
+
+    def _lookup_many(
+        self, keys: List[str]
+    ) -> Tuple[List[Optional[Dict[str, Any]]], Set[str]]:
+        results = [self._lookup(key) for key in keys]
+        missing = {key for key, claims in zip(keys, results) if claims is None}
+        return results, missing
+
+    def _load_many(self, db: Session, keys: Set[str]) -> Dict[str, Dict[str, Any]]:
+        # One table query for a batch of misses; skips the shared cache,
+        # which would cost a round trip per key
+        now = self._clock()
+        utcnow = self._utcnow()
+        rows = (
+            db.query(UserSession)
+            .filter(UserSession.id.in_(keys), UserSession.expires_at > utcnow)
+            .all()
+        )
+
+        loaded = {}
+        with self._lock:
+            for row in rows:
+                record = SessionRecord(
+                    str(row.user_id),
+                    row.email,
+                    row.role,
+                    row.name,
+                    row.picture,
+                    now + (row.expires_at - utcnow).total_seconds(),
+                )
+                self._remember(row.id, record)
+                loaded[row.id] = record.to_claims()
+        return loaded
+
+    def revoke(self, db: Session, session_id: str) -> None:
+        """Delete a session from memory on every node and from the table"""
+        key = hash_session_id(session_id)
+        self.evict(key)
+
+        db.query(UserSession).filter(UserSession.id == key).delete()
+        db.commit()
+
+        self.cache.invalidate(SESSION_NAMESPACE, key)
+
+    async def arevoke(self, db: Session, session_id: str) -> None:
+        """revoke for async handlers, run in a worker thread"""
+        await asyncio.to_thread(self.revoke, db, session_id)
+
+    def purge_expired(self, db: Session) -> int:
+        """
+        Delete expired rows from the table
+
+        Returns:
+            Number of rows deleted
+        """
+        deleted = (
+            db.query(UserSession)
+            .filter(UserSession.expires_at <= self._utcnow())
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._records),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+async def purge_expired_sessions(
+    session_factory: Callable[[], Session], interval_seconds: int
+) -> None:
+    """
+    Periodically delete expired rows so `user_sessions` doesn't grow forever
+
+    Runs until cancelled; the DELETE runs in a worker thread to keep it off
+    the event loop.
+    """
+
+    def purge() -> None:
+        db = session_factory()
+        try:
+            session_store.purge_expired(db)
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            await asyncio.to_thread(purge)
+        except Exception:
+            # Try again next interval rather than stop purging for good
+            logger.exception("Failed to purge expired sessions")
+
+
+session_store = SessionStore(
+    max_entries=settings.SESSION_STORE_MAX_ENTRIES,
+    tick_seconds=settings.SESSION_STORE_TICK_SECONDS,
+    ttl_seconds=settings.JWT_EXPIRE_MINUTES * 60,
+)
@@ -1,14 +1,22 @@
 import base64
 import os
 import secrets
+import struct
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 
-import jwt
-import requests
+from app.auth.providers import get_provider
 from app.config import settings
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+# Refresh token envelope: version (1 byte) | key id (1 byte) | iv (12 bytes)
+# | ciphertext | tag (16 bytes). The header is authenticated as associated
+# data, so a tampered version or key id fails decryption.
+ENVELOPE_VERSION = 1
+_ENVELOPE_HEADER = struct.Struct("BB")
+_IV_SIZE = 12
+_TAG_SIZE = 16
+
 
 def generate_state() -> str:
     """Generate a random state string for CSRF protection
@@ -94,43 +102,101 @@ def decrypt_refresh_token(encrypted_token: str, iv: str, tag: str) -> str:
     return decrypted_token.decode("utf-8")
 
 
-def verify_id_token(id_token: str) -> Dict:
+def _encryption_key(key_id: int) -> bytes:
+    if key_id == settings.ENCRYPTION_KEY_ID:
+        return base64.b64decode(settings.ENCRYPTION_KEY)
+    if key_id in settings.ENCRYPTION_PREVIOUS_KEYS:
+        return base64.b64decode(settings.ENCRYPTION_PREVIOUS_KEYS[key_id])
+    raise ValueError(f"Unknown encryption key id: {key_id}")
+
+
+def seal_refresh_token(refresh_token: str) -> bytes:
     """
-    Verify a Google ID token using Google's public keys
+    Encrypt a refresh token into a compact binary envelope
 
     Args:
-        id_token: The ID token to verify
+        refresh_token: The refresh token to encrypt
 
     Returns:
-        The decoded token payload if valid
+        Envelope bytes, encrypted with the current ENCRYPTION_KEY_ID
+    """
+    header = _ENVELOPE_HEADER.pack(ENVELOPE_VERSION, settings.ENCRYPTION_KEY_ID)
+    iv = os.urandom(_IV_SIZE)
+
+    # encrypt() returns the ciphertext with the tag appended
+    cipher = AESGCM(_encryption_key(settings.ENCRYPTION_KEY_ID))
+    return header + iv + cipher.encrypt(iv, refresh_token.encode("utf-8"), header)
+
+
+def open_refresh_token(envelope: bytes) -> str:
+    """
+    Decrypt a refresh token envelope created by seal_refresh_token
+
+    Args:
+        envelope: Envelope bytes
+
+    Returns:
+        The decrypted refresh token
 
     Raises:
-        ValueError: If token is invalid
+        ValueError: If the envelope version or key id is unknown
     """
-    # Fetch Google's public keys
-    response = requests.get(settings.GOOGLE_CERTS_URL)
-    keys = response.json()
+    envelope = bytes(envelope)
+    if len(envelope) < _ENVELOPE_HEADER.size + _IV_SIZE + _TAG_SIZE:
+        raise ValueError("Truncated refresh token envelope")
 
-    # Get the token header to determine which key to use
-    header = jwt.get_unverified_header(id_token)
-    kid = header.get("kid")
+    version, key_id = _ENVELOPE_HEADER.unpack_from(envelope)
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Unknown refresh token envelope version: {version}")
 
-    if not kid or kid not in keys:
-        raise ValueError("Invalid token: no matching key found")
+    header = envelope[: _ENVELOPE_HEADER.size]
+    iv = envelope[_ENVELOPE_HEADER.size : _ENVELOPE_HEADER.size + _IV_SIZE]
+    ciphertext_with_tag = envelope[_ENVELOPE_HEADER.size + _IV_SIZE :]
 
-    # Get the public key
-    public_key = keys[kid]
+    cipher = AESGCM(_encryption_key(key_id))
+    return cipher.decrypt(iv, ciphertext_with_tag, header).decode("utf-8")
 
-    # Verify and decode the token
-    payload = jwt.decode(
-        id_token,
-        public_key,
-        algorithms=["RS256"],
-        audience=settings.GOOGLE_CLIENT_ID,
-        options={"verify_exp": True},
-    )
 
-    return payload
+def read_refresh_token(user) -> Optional[str]:
+    """
+    Decrypt a user's stored refresh token in either storage format
+
+    Rows not yet converted by app.db.migrate_refresh_tokens still hold the
+    token in the three base64 columns.
+
+    Args:
+        user: User row
+
+    Returns:
+        The refresh token, or None if none is stored
+    """
+    if user.refresh_token_envelope:
+        return open_refresh_token(user.refresh_token_envelope)
+    if user.encrypted_refresh_token:
+        return decrypt_refresh_token(
+            user.encrypted_refresh_token,
+            user.refresh_token_iv,
+            user.refresh_token_tag,
+        )
+    return None
+
+
+def verify_id_token(id_token: str, provider: str = "google") -> Dict:
+    """
+    Verify an ID token using the provider's public keys
+
+    Args:
+        id_token: The ID token to verify
+        provider: Registry name of the issuing provider
+
+    Returns:
+        The decoded token payload if valid
+
+    Raises:
+        ValueError: If token is invalid
+    """
+    # Keys are fetched and cached by the provider
+    return get_provider(provider).verify_id_token(id_token)
 
 
 def create_auth_cookies(
@@ -0,0 +1,369 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Channel carrying invalidation messages between nodes
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class CacheBackend(ABC):
+    """
+    Shared cache tier, reachable from every node
+
+    Values are opaque bytes; SharedCache handles serialization.
+    Subscribers may be called from a backend thread.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a value, None if missing or expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        """Store a value for `ttl_seconds`"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a value"""
+
+    @abstractmethod
+    def publish(self, channel: str, message: bytes) -> None:
+        """Send a message to every subscriber of `channel`, on all nodes"""
+
+    @abstractmethod
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> None:
+        """Call `callback` with every message published to `channel`"""
+
+    def close(self) -> None:
+        """Release connections and stop subscriber threads"""
+
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process stand-in for a shared cache server
+
+    Caches that share one instance behave like nodes sharing a server, which
+    is how the tests exercise cross-node invalidation.
+
+    Args:
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._values: Dict[str, Tuple[float, bytes]] = {}
+        self._subscribers: Dict[str, List[Callable[[bytes], None]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._values[key]
+                return None
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            self._values[key] = (self._clock() + ttl_seconds, value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def publish(self, channel: str, message: bytes) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for callback in subscribers:
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> None:
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Redis-backed shared tier, with invalidations over Redis pub/sub
+
+    Requires the `redis` package, which is only needed when
+    CACHE_BACKEND_URL points at Redis.
+
+    Args:
+        url: Redis URL, e.g. redis://cache:6379/0
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(
+            url,
+            socket_timeout=settings.CACHE_BACKEND_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.CACHE_BACKEND_TIMEOUT_SECONDS,
+        )
+        self._pubsub = None
+        self._thread = None
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._client.set(key, value, px=max(int(ttl_seconds * 1000), 1))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+    def publish(self, channel: str, message: bytes) -> None:
+        self._client.publish(channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[bytes], None]) -> None:
+        if self._pubsub is None:
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: lambda message: callback(message["data"])})
+        if self._thread is None:
+            self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+        self._client.close()
+
+
+def create_backend(url: Optional[str]) -> Optional[CacheBackend]:
+    """
+    Create the shared tier for CACHE_BACKEND_URL
+
+    Returns:
+        A backend, or None to disable sharing
+
+    Raises:
+        ValueError: If the URL scheme is not supported
+    """
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported cache backend: {url}")
+
+
+class SharedCache:
+    """
+    Cache shared by the auth modules across nodes
+
+    - Each owner keeps its own in-process structure (the session store's
+      LRU, a provider's parsed JWKS); this cache is the shared tier behind
+      it, reachable from every node through an optional CacheBackend
+    - `set` and `invalidate` publish an invalidation, so every other node
+      calls the listeners registered with `on_invalidate` for that namespace
+      and drops its in-process copy
+    - Without a backend every lookup is a miss, so single-node deployments
+      only pay for a dict lookup
+
+    Keys live in namespaces, each with its own TTL (CACHE_NAMESPACE_TTLS) and
+    stats. Values must be JSON serializable.
+
+    Backend calls block on network I/O; async code uses `aget`, `aset` and
+    `ainvalidate`, which run them in a worker thread.
+
+    Args:
+        namespace_ttls: TTL in seconds per namespace
+        default_ttl_seconds: TTL for namespaces without one
+        backend: Shared tier, None to disable sharing
+    """
+
+    def __init__(
+        self,
+        namespace_ttls: Dict[str, float],
+        default_ttl_seconds: float,
+        backend: Optional[CacheBackend] = None,
+    ):
+        self.namespace_ttls = namespace_ttls
+        self.default_ttl_seconds = default_ttl_seconds
+        self.backend = backend
+        # Identifies this node's own messages, which it ignores
+        self.node_id = uuid.uuid4().hex
+
+        self._listeners: Dict[str, List[Callable[[str], None]]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+        if backend is not None:
+            backend.subscribe(INVALIDATION_CHANNEL, self._on_message)
+
+    def ttl(self, namespace: str) -> float:
+        return self.namespace_ttls.get(namespace, self.default_ttl_seconds)
+
+    def _incr(self, namespace: str, name: str) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(
+                namespace,
+                {
+                    "hits": 0,
+                    "misses": 0,
+                    "sets": 0,
+                    "invalidations_sent": 0,
+                    "invalidations_received": 0,
+                    "backend_errors": 0,
+                },
+            )
+            counters[name] += 1
+
+    def _backend_call(self, namespace: str, fn: Callable, *args: Any) -> Any:
+        # The shared tier is an optimization; when it is down, fall back to
+        # the owner's in-process copy and the source of truth
+        try:
+            return fn(*args)
+        except Exception:
+            logger.error("Cache backend call failed", exc_info=True)
+            self._incr(namespace, "backend_errors")
+            return None
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Get a value from the shared tier
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        raw = None
+        if self.backend is not None:
+            raw = self._backend_call(namespace, self.backend.get, f"{namespace}:{key}")
+
+        if raw is None:
+            self._incr(namespace, "misses")
+            return None
+        self._incr(namespace, "hits")
+        return json.loads(raw)
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Store a value in the shared tier and invalidate it on other nodes
+
+        Args:
+            namespace: Cache namespace
+            key: Key within the namespace
+            value: JSON serializable value
+            ttl_seconds: Lifetime of the value, e.g. so it doesn't outlive
+                the cached object; never longer than the namespace TTL
+        """
+        if self.backend is None:
+            return
+
+        ttl = self.ttl(namespace)
+        if ttl_seconds is not None:
+            ttl = min(ttl, ttl_seconds)
+        self._incr(namespace, "sets")
+        self._backend_call(
+            namespace,
+            self.backend.set,
+            f"{namespace}:{key}",
+            json.dumps(value).encode("utf-8"),
+            ttl,
+        )
+        self._publish(namespace, key)
+
+    def invalidate(self, namespace: str, key: str) -> None:
+        """Remove a value from the shared tier and every node's in-process copy"""
+        if self.backend is None:
+            return
+        self._backend_call(namespace, self.backend.delete, f"{namespace}:{key}")
+        self._publish(namespace, key)
+
+    async def aget(self, namespace: str, key: str) -> Optional[Any]:
+        """get for async code; backend I/O runs in a worker thread"""
+        if self.backend is None:
+            return self.get(namespace, key)
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def aset(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        """set for async code; backend I/O runs in a worker thread"""
+        if self.backend is not None:
+            await asyncio.to_thread(self.set, namespace, key, value, ttl_seconds)
+
+    async def ainvalidate(self, namespace: str, key: str) -> None:
+        """invalidate for async code; backend I/O runs in a worker thread"""
+        if self.backend is not None:
+            await asyncio.to_thread(self.invalidate, namespace, key)
+
+    def on_invalidate(self, namespace: str, callback: Callable[[str], None]) -> None:
+        """
+        Register a callback for invalidations published by other nodes
+
+        Lets modules that keep their own in-process structure (e.g. the
+        session store's LRU) drop entries invalidated elsewhere. The callback
+        may run on a backend thread.
+        """
+        with self._lock:
+            self._listeners.setdefault(namespace, []).append(callback)
+
+    def _publish(self, namespace: str, key: str) -> None:
+        message = json.dumps({"node": self.node_id, "ns": namespace, "key": key})
+        self._incr(namespace, "invalidations_sent")
+        self._backend_call(
+            namespace,
+            self.backend.publish,
+            INVALIDATION_CHANNEL,
+            message.encode("utf-8"),
+        )
+
+    def _on_message(self, message: bytes) -> None:
+        data = json.loads(message)
+        if data["node"] == self.node_id:
+            return
+
+        namespace, key = data["ns"], data["key"]
+        self._incr(namespace, "invalidations_received")
+        with self._lock:
+            listeners = list(self._listeners.get(namespace, []))
+        for callback in listeners:
+            callback(key)
+
+    def close(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__ if self.backend else None,
+                "namespaces": {
+                    namespace: dict(counters)
+                    for namespace, counters in self._counters.items()
+                },
+            }
+
+
+shared_cache = SharedCache(
+    namespace_ttls=settings.CACHE_NAMESPACE_TTLS,
+    default_ttl_seconds=settings.CACHE_DEFAULT_TTL_SECONDS,
+    backend=create_backend(settings.CACHE_BACKEND_URL),
+)
@@ -1,8 +1,11 @@
-from typing import List, Optional
+import logging
+from typing import Dict, List, Literal, Optional
 
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+logger = logging.getLogger(__name__)
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -16,6 +19,20 @@ class Settings(BaseSettings):
     GOOGLE_TOKEN_URL: str = "https://oauth2.googleapis.com/token"
     GOOGLE_USERINFO_URL: str = "https://www.googleapis.com/oauth2/v1/userinfo"
     GOOGLE_CERTS_URL: str = "https://www.googleapis.com/oauth2/v3/certs"
+    GOOGLE_ISSUER: str = "https://accounts.google.com"
+
+    # Per-user Google access token cache
+    GOOGLE_TOKEN_CACHE_MAX_ENTRIES: int = 10_000
+    GOOGLE_TOKEN_REFRESH_AHEAD_SECONDS: int = 300
+    GOOGLE_TOKEN_EXPIRY_SKEW_SECONDS: int = 30
+
+    # Additional OIDC providers, as JSON:
+    # {"name": {"issuer": "...", "client_id": "...", "client_secret": "..."}}
+    OIDC_PROVIDERS: Dict[str, Dict[str, str]] = {}
+    OIDC_DISCOVERY_TTL_SECONDS: int = 60 * 60 * 24
+    OIDC_JWKS_TTL_SECONDS: int = 60 * 60
+    OIDC_HTTP_POOL_SIZE: int = 10
+    OIDC_HTTP_TIMEOUT_SECONDS: int = 10
 
     # App settings
     APP_NAME: str = "Google OAuth Demo"
@@ -24,17 +41,88 @@ class Settings(BaseSettings):
     FRONTEND_URL: Optional[str] = None
     CORS_ORIGINS: List[str] = ["http://localhost:5173"]
 
-    @field_validator("CORS_ORIGINS", mode="before")
+    @field_validator("CORS_ORIGINS", "DATABASE_REPLICA_URLS", mode="before")
     def assemble_cors_origins(cls, v):
         if isinstance(v, str) and not v.startswith("["):
             return [i.strip() for i in v.split(",")]
         return v
 
+    @field_validator("ENCRYPTION_KEY_ID")
+    def check_encryption_key_id(cls, v):
+        # Stored in a single byte of the refresh token envelope
+        if not 0 <= v <= 255:
+            raise ValueError("ENCRYPTION_KEY_ID must be between 0 and 255")
+        return v
+
+    @field_validator("OIDC_PROVIDERS")
+    def check_oidc_providers(cls, v):
+        for name, config in v.items():
+            missing = [key for key in ("issuer", "client_id") if not config.get(key)]
+            if missing:
+                raise ValueError(f"OIDC provider {name!r} is missing {missing}")
+        return v
+
     # JWT settings
     JWT_SECRET: Optional[str] = None
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_MINUTES: int = 15
 
+    # Session settings
+    SESSION_MODE: Literal["jwt", "opaque"] = "jwt"  # opaque keeps claims server-side
+    SESSION_STORE_MAX_ENTRIES: int = 100_000
+    SESSION_STORE_TICK_SECONDS: int = 30
+    SESSION_PURGE_INTERVAL_SECONDS: int = 60 * 10
+
+    # Token introspection for internal services
+    INTROSPECTION_SECRET: Optional[str] = None
+    INTROSPECTION_MAX_BATCH: int = 500
+    INTROSPECTION_MAX_CACHE_SECONDS: int = 60
+
+    # Cache shared by the auth modules across nodes, behind their own
+    # in-process copies (redis://... or memory:// for a single-process
+    # stand-in; unset disables sharing)
+    CACHE_BACKEND_URL: Optional[str] = None
+    CACHE_BACKEND_TIMEOUT_SECONDS: float = 0.5
+    # Maximum lifetime of a shared entry, per namespace
+    CACHE_DEFAULT_TTL_SECONDS: int = 300
+    CACHE_NAMESPACE_TTLS: Dict[str, int] = {"jwks": 60 * 60, "sessions": 60 * 15}
+
+    # Duplicate OAuth callbacks (same code) share one login
+    CALLBACK_DEDUP_TTL_SECONDS: int = 60
+    CALLBACK_DEDUP_MAX_ENTRIES: int = 10_000
+
+    # Executor for CPU-bound crypto (RSA, HMAC, AES-GCM)
+    # "process" runs RSA verification in a process pool, "inline" disables it
+    CRYPTO_EXECUTOR: Literal["thread", "process", "inline"] = "thread"
+    CRYPTO_MAX_WORKERS: int = 4
+    CRYPTO_MAX_PENDING: int = 256
+    # Work estimated below this many microseconds runs on the event loop
+    CRYPTO_OFFLOAD_THRESHOLD_US: int = 100
+
+    # Startup warmup; /ready reports 503 until it finishes
+    WARMUP_ENABLED: bool = True
+    WARMUP_DB_CONNECTIONS: int = 5
+    WARMUP_TIMEOUT_SECONDS: int = 30
+
+    # Operator-only memory diagnostics under /diagnostics (admin role)
+    DIAGNOSTICS_ENABLED: bool = False
+    # Stack frames kept per allocation while tracemalloc is tracing
+    DIAGNOSTICS_TRACE_FRAMES: int = 10
+
+    # Structured logging: JSON lines written by a background thread
+    LOG_LEVEL: str = "INFO"
+    LOG_FILE: Optional[str] = None  # stdout when unset
+    LOG_QUEUE_SIZE: int = 10_000
+    # Fraction of successful requests logged per path; errors always are
+    LOG_SAMPLE_RATES: Dict[str, float] = {"/health": 0.0, "/ready": 0.0}
+    LOG_SAMPLE_DEFAULT_RATE: float = 1.0
+    # At most LOG_ERROR_BURST identical errors per interval
+    LOG_ERROR_BURST: int = 10
+    LOG_ERROR_INTERVAL_SECONDS: float = 60.0
+    # At most LOG_ACCESS_ERROR_BURST error access lines per path and status
+    # per LOG_ERROR_INTERVAL_SECONDS
+    LOG_ACCESS_ERROR_BURST: int = 100
+
     # Cookie settings
     COOKIE_DOMAIN: str = "localhost"
     COOKIE_SECURE: bool = False
@@ -43,9 +131,30 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: Optional[str] = None
+    # Read replicas for read-only sessions (comma separated)
+    DATABASE_REPLICA_URLS: List[str] = []
+    DATABASE_REPLICA_RETRY_SECONDS: float = 30.0
+    # Reads for a user go to the primary this long after their own write
+    DATABASE_STICKY_SECONDS: float = 5.0
+
+    # Login audit log (write-behind)
+    AUDIT_QUEUE_SIZE: int = 10_000
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    AUDIT_OVERFLOW_POLICY: Literal["drop", "block"] = "drop"
+    AUDIT_BLOCK_TIMEOUT_SECONDS: float = 0.05
+
+    # Batched last_login_at updates
+    LAST_LOGIN_FLUSH_INTERVAL_SECONDS: float = 30.0
+    LAST_LOGIN_MAX_PENDING: int = 5_000
 
     # Encryption
     ENCRYPTION_KEY: Optional[str] = None
+    # Recorded in each refresh token envelope (0-255); bump when rotating
+    ENCRYPTION_KEY_ID: int = 1
+    # Earlier keys by id, as JSON, kept to read envelopes sealed with them
+    ENCRYPTION_PREVIOUS_KEYS: Dict[int, str] = {}
+    REFRESH_TOKEN_MIGRATION_BATCH_SIZE: int = 500
 
     # GCP Secret Manager (Optional, for production)
     GCP_PROJECT_ID: Optional[str] = None
@@ -67,7 +176,7 @@ def get_secret(secret_name: str) -> str:
         response = client.access_secret_version(request={"name": name})
         return response.payload.data.decode("UTF-8")
     except Exception as e:
-        print(f"Error fetching secret {secret_name}: {e}")
+        logger.error("Error fetching secret %s: %s", secret_name, e)
         return None
 
 
@@ -81,6 +190,7 @@ if settings.APP_ENV == "production" and settings.GCP_PROJECT_ID:
         "GOOGLE_CLIENT_SECRET",
         "JWT_SECRET",
         "ENCRYPTION_KEY",
+        "INTROSPECTION_SECRET",
     ]:
         secret_value = get_secret(field.lower())
         if secret_value:
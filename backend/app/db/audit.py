@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.db.database import SessionLocal
+from app.models.audit import LoginEvent
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Column limits from the model, applied before queueing
+_TRUNCATE = {"user_agent": 512, "detail": 512}
+
+# Queued by stop() to wake the writer thread without waiting for a timeout
+_WAKE: Dict[str, Any] = {}
+
+
+class AuditWriter:
+    """
+    Write-behind writer for login audit events
+
+    Events are queued in memory and written by a background thread in
+    multi-row INSERTs, flushed when a batch fills up or the flush interval
+    passes, so recording a login never waits on the database.
+
+    Args:
+        session_factory: Callable returning a new database session
+        max_queue: Maximum number of events held in memory
+        batch_size: Maximum rows per INSERT
+        flush_interval: Seconds before a partial batch is written
+        overflow_policy: "drop" discards events when the queue is full;
+            "block" makes `arecord` wait up to block_timeout for space, then
+            discards
+        block_timeout: Seconds to wait for queue space with the "block" policy
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        overflow_policy: str = "drop",
+        block_timeout: float = 0.05,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counter_lock = threading.Lock()
+        self.counters = {
+            "enqueued": 0,
+            "dropped": 0,
+            "written": 0,
+            "failed": 0,
+            "flushes": 0,
+        }
+
+    def _incr(self, name: str, value: int = 1) -> None:
+        with self._counter_lock:
+            self.counters[name] += value
+
+    @staticmethod
+    def _prepare(event: Dict[str, Any]) -> Dict[str, Any]:
+        event.setdefault("created_at", datetime.utcnow())
+        for column, limit in _TRUNCATE.items():
+            if event.get(column):
+                event[column] = event[column][:limit]
+        return event
+
+    def record(self, **event: Any) -> bool:
+        """
+        Queue a login event without ever waiting for queue space
+
+        Args:
+            **event: LoginEvent column values; created_at defaults to now
+
+        Returns:
+            True if the event was queued, False if it was dropped
+        """
+        try:
+            self._queue.put_nowait(self._prepare(event))
+        except queue.Full:
+            self._incr("dropped")
+            return False
+
+        self._incr("enqueued")
+        return True
+
+    async def arecord(self, **event: Any) -> bool:
+        """
+        Queue a login event from async code, applying the overflow policy
+
+        With the "block" policy a full queue makes the caller wait up to
+        block_timeout in a worker thread, so only this request is slowed
+        down, never the event loop.
+
+        Returns:
+            True if the event was queued, False if it was dropped
+        """
+        event = self._prepare(event)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            if self.overflow_policy != "block":
+                self._incr("dropped")
+                return False
+            try:
+                await asyncio.to_thread(
+                    self._queue.put, event, True, self.block_timeout
+                )
+            except queue.Full:
+                self._incr("dropped")
+                return False
+
+        self._incr("enqueued")
+        return True
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        db = self.session_factory()
+        try:
+            # One multi-row INSERT ... VALUES (...), (...) per batch
+            db.execute(insert(LoginEvent).values(batch))
+            db.commit()
+            self._incr("written", len(batch))
+        except Exception:
+            logger.exception("Failed to write %d login events", len(batch))
+            db.rollback()
+            self._incr("failed", len(batch))
+        finally:
+            db.close()
+            self._incr("flushes")
+
+    def _drain(self, batch: List[Dict[str, Any]]) -> None:
+        # Write everything still queued, in full batches
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is _WAKE:
+                continue
+            batch.append(event)
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while not self._stopping.is_set():
+            timeout = max(deadline - time.monotonic(), 0)
+            try:
+                event = self._queue.get(timeout=timeout)
+                if event is not _WAKE:
+                    batch.append(event)
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._write(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+        self._drain(batch)
+
+    def start(self) -> None:
+        """Start the background writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the writer after flushing every queued event"""
+        if self._thread is None:
+            self._drain([])
+            return
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            # A full queue wakes the thread on its own
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._counter_lock:
+            return {**self.counters, "queued": self._queue.qsize()}
+
+
+def get_recent_login_events(
+    db: Session, user_id: int, limit: int = 20
+) -> List[LoginEvent]:
+    """
+    Get a user's most recent login events
+
+    Uses the (user_id, created_at) index, so the cost doesn't grow with the
+    size of the table.
+
+    Args:
+        db: Database session
+        user_id: ID of the user
+        limit: Maximum number of events to return
+
+    Returns:
+        Events ordered from newest to oldest
+    """
+    return (
+        db.query(LoginEvent)
+        .filter(LoginEvent.user_id == user_id)
+        .order_by(LoginEvent.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+audit_writer = AuditWriter(
+    SessionLocal,
+    max_queue=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+    overflow_policy=settings.AUDIT_OVERFLOW_POLICY,
+    block_timeout=settings.AUDIT_BLOCK_TIMEOUT_SECONDS,
+)
@@ -1,7 +1,13 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, List, Optional
+
 from app.config import settings
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 # Create SQLAlchemy engine
 engine = create_engine(str(settings.DATABASE_URL))
@@ -28,3 +34,144 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class Replica:
+    """A read replica and its health state"""
+
+    def __init__(self, url: str):
+        self.url = url
+        # pre_ping drops connections the replica closed during failover
+        self.engine = create_engine(url, pool_pre_ping=True)
+        self.session_factory = sessionmaker(
+            autocommit=False, autoflush=False, bind=self.engine
+        )
+        self.unhealthy_until = 0.0
+
+
+class ReadRouter:
+    """
+    Routes read-only sessions across read replicas
+
+    Replicas are used round-robin. A replica that fails with an
+    OperationalError is taken out of rotation for `retry_seconds` and probed
+    with SELECT 1 before it is used again. With no healthy replica, reads go
+    to the primary.
+
+    Read-your-writes: after `mark_written(key)`, reads for the same key go to
+    the primary for `sticky_seconds`, so a user sees their own write even if
+    the replicas lag.
+
+    Args:
+        primary_factory: Session factory for the primary
+        replica_urls: Database URLs of the replicas
+        retry_seconds: How long a failed replica stays out of rotation
+        sticky_seconds: How long reads stick to the primary after a write
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        primary_factory: Callable[[], Session],
+        replica_urls: List[str],
+        retry_seconds: float,
+        sticky_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.primary_factory = primary_factory
+        self.replicas = [Replica(url) for url in replica_urls]
+        self.retry_seconds = retry_seconds
+        self.sticky_seconds = sticky_seconds
+        self._clock = clock
+        self._next = 0
+        # Pins in expiry order: every pin lasts sticky_seconds, so a re-pinned
+        # key moves to the end
+        self._sticky: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark_written(self, key: str) -> None:
+        """Pin reads for `key` to the primary for the sticky window"""
+        if not self.replicas:
+            return
+        now = self._clock()
+        with self._lock:
+            # Drop expired pins from the front, so the map only holds recent
+            # writers and each call only pays for what expired
+            while self._sticky:
+                oldest_key, until = next(iter(self._sticky.items()))
+                if until > now:
+                    break
+                del self._sticky[oldest_key]
+            self._sticky.pop(key, None)
+            self._sticky[key] = now + self.sticky_seconds
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        with self._lock:
+            until = self._sticky.get(key)
+        return until is not None and until > self._clock()
+
+    def mark_unhealthy(self, replica: Replica) -> None:
+        replica.unhealthy_until = self._clock() + self.retry_seconds
+
+    def _probe(self, replica: Replica) -> bool:
+        try:
+            with replica.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return True
+        except OperationalError:
+            self.mark_unhealthy(replica)
+            return False
+
+    def choose(self, sticky_key: Optional[str] = None) -> Optional[Replica]:
+        """
+        Pick a replica for a read
+
+        Returns:
+            A healthy replica, or None to read from the primary
+        """
+        if not self.replicas or self.is_sticky(sticky_key):
+            return None
+
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+            if replica.unhealthy_until == 0.0:
+                return replica
+            if replica.unhealthy_until <= self._clock() and self._probe(replica):
+                replica.unhealthy_until = 0.0
+                return replica
+        return None
+
+    def session(self, sticky_key: Optional[str] = None) -> Iterator[Session]:
+        """Yield a read-only session, marking the replica unhealthy on failure"""
+        replica = self.choose(sticky_key)
+        db = replica.session_factory() if replica else self.primary_factory()
+        try:
+            yield db
+        except OperationalError:
+            if replica is not None:
+                self.mark_unhealthy(replica)
+            raise
+        finally:
+            db.close()
+
+
+read_router = ReadRouter(
+    SessionLocal,
+    settings.DATABASE_REPLICA_URLS,
+    retry_seconds=settings.DATABASE_REPLICA_RETRY_SECONDS,
+    sticky_seconds=settings.DATABASE_STICKY_SECONDS,
+)
+
+
+def get_read_db():
+    """
+    Dependency function to get a read-only database session
+
+    Served by a healthy replica when DATABASE_REPLICA_URLS is set, otherwise
+    by the primary. Use get_db for anything that writes.
+    """
+    yield from read_router.session()
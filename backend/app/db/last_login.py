@@ -0,0 +1,154 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from app.config import settings
+from app.db.database import SessionLocal
+from app.models.user import User
+from sqlalchemy import DateTime, bindparam, inspect, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+users = User.__table__
+
+
+def ensure_last_login_column(bind: Engine) -> None:
+    """Add users.last_login_at to databases created before it existed"""
+    columns = {column["name"] for column in inspect(bind).get_columns("users")}
+    if "last_login_at" in columns:
+        return
+
+    column_type = DateTime().compile(dialect=bind.dialect)
+    with bind.begin() as conn:
+        conn.execute(text(f"ALTER TABLE users ADD COLUMN last_login_at {column_type}"))
+
+
+class LastLoginTracker:
+    """
+    Batches last_login_at updates
+
+    Logins only record the timestamp in memory; a background thread writes
+    all pending timestamps in one executemany UPDATE per flush. Repeated
+    logins by the same user between flushes collapse into one row update.
+
+    Args:
+        session_factory: Callable returning a new database session
+        flush_interval: Seconds between flushes
+        max_pending: Pending users that trigger an early flush
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        flush_interval: float,
+        max_pending: int,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counters = {"touched": 0, "written": 0, "failed": 0, "flushes": 0}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def touch(self, user_id: int, at: Optional[datetime] = None) -> None:
+        """Record a login for `user_id` to be written on the next flush"""
+        at = at or datetime.utcnow()
+        with self._lock:
+            current = self._pending.get(user_id)
+            if current is None or at > current:
+                self._pending[user_id] = at
+            self.counters["touched"] += 1
+            pending = len(self._pending)
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Write all pending timestamps
+
+        Returns:
+            Number of users updated
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        # Setting updated_at to itself stops its onupdate from firing: a
+        # login isn't a profile change
+        stmt = (
+            update(users)
+            .where(users.c.id == bindparam("b_id"))
+            .values(last_login_at=bindparam("b_at"), updated_at=users.c.updated_at)
+        )
+        rows = [{"b_id": user_id, "b_at": at} for user_id, at in pending.items()]
+
+        db = self.session_factory()
+        try:
+            db.execute(stmt, rows)
+            db.commit()
+            with self._lock:
+                self.counters["written"] += len(rows)
+        except Exception:
+            logger.exception("Failed to write last_login_at for %d users", len(rows))
+            db.rollback()
+            with self._lock:
+                self.counters["failed"] += len(rows)
+                # Keep the newest timestamp for the next attempt
+                for user_id, at in pending.items():
+                    current = self._pending.get(user_id)
+                    if current is None or at > current:
+                        self._pending[user_id] = at
+        finally:
+            db.close()
+            with self._lock:
+                self.counters["flushes"] += 1
+        return len(rows)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="last-login-flusher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the flush thread after writing everything pending"""
+        if self._thread is None:
+            self.flush()
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counters, "pending": len(self._pending)}
+
+
+last_login_tracker = LastLoginTracker(
+    SessionLocal,
+    flush_interval=settings.LAST_LOGIN_FLUSH_INTERVAL_SECONDS,
+    max_pending=settings.LAST_LOGIN_MAX_PENDING,
+)
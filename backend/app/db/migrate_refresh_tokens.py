@@ -0,0 +1,119 @@
+"""
+Convert refresh tokens from the three base64 columns to the binary envelope
+
+Streams over users in primary key order, one batch per transaction, so it
+can run against a live database and be resumed after an interruption:
+
+    python -m app.db.migrate_refresh_tokens
+"""
+
+import logging
+from typing import Callable
+
+from app.auth.utils import decrypt_refresh_token, seal_refresh_token
+from app.config import settings
+from app.db.database import SessionLocal, engine
+from app.models.user import User
+from sqlalchemy import LargeBinary, bindparam, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+users = User.__table__
+
+
+def ensure_envelope_column(bind: Engine) -> None:
+    """Add users.refresh_token_envelope to databases created before it existed"""
+    columns = {column["name"] for column in inspect(bind).get_columns("users")}
+    if "refresh_token_envelope" in columns:
+        return
+
+    column_type = LargeBinary().compile(dialect=bind.dialect)
+    with bind.begin() as conn:
+        conn.execute(
+            text(f"ALTER TABLE users ADD COLUMN refresh_token_envelope {column_type}")
+        )
+
+
+def migrate_refresh_tokens(
+    session_factory: Callable[[], Session], batch_size: int
+) -> int:
+    """
+    Seal legacy refresh tokens into envelopes and clear the legacy columns
+
+    Args:
+        session_factory: Callable returning a new database session
+        batch_size: Rows converted per transaction
+
+    Returns:
+        Number of users converted
+    """
+    # Keeping updated_at unchanged: re-encoding isn't a profile change
+    stmt = (
+        update(users)
+        .where(users.c.id == bindparam("b_id"))
+        .values(
+            refresh_token_envelope=bindparam("b_envelope"),
+            encrypted_refresh_token=None,
+            refresh_token_iv=None,
+            refresh_token_tag=None,
+            updated_at=users.c.updated_at,
+        )
+    )
+
+    converted = 0
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            # Keyset pagination: each batch starts after the last converted id
+            rows = db.execute(
+                select(
+                    users.c.id,
+                    users.c.encrypted_refresh_token,
+                    users.c.refresh_token_iv,
+                    users.c.refresh_token_tag,
+                )
+                .where(
+                    users.c.id > last_id,
+                    users.c.encrypted_refresh_token.is_not(None),
+                )
+                .order_by(users.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return converted
+
+            params = []
+            for user_id, encrypted_token, iv, tag in rows:
+                try:
+                    refresh_token = decrypt_refresh_token(encrypted_token, iv, tag)
+                except Exception:
+                    # Left as is; the user gets a new token on next login
+                    logger.warning(
+                        "Skipping undecryptable refresh token of user %s", user_id
+                    )
+                    continue
+                params.append(
+                    {"b_id": user_id, "b_envelope": seal_refresh_token(refresh_token)}
+                )
+
+            if params:
+                db.execute(stmt, params)
+                db.commit()
+        finally:
+            db.close()
+
+        converted += len(params)
+        last_id = rows[-1][0]
+        logger.info("Converted %d refresh tokens (up to user %d)", converted, last_id)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    ensure_envelope_column(engine)
+    total = migrate_refresh_tokens(
+        SessionLocal, settings.REFRESH_TOKEN_MIGRATION_BATCH_SIZE
+    )
+    logger.info("Done, %d refresh tokens converted", total)
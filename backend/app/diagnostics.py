@@ -0,0 +1,182 @@
+import asyncio
+import gc
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from app.auth.callback_dedup import callback_deduplicator
+from app.auth.crypto_executor import crypto_executor
+from app.auth.google_tokens import access_token_cache
+from app.auth.jwt import require_admin
+from app.auth.providers import all_providers
+from app.auth.session_store import session_store
+from app.cache import shared_cache
+from app.config import settings
+from app.db.audit import audit_writer
+from app.db.database import engine, read_router
+from app.db.last_login import last_login_tracker
+from app.log import logging_stats
+from fastapi import APIRouter, Depends, HTTPException, status
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"])
+
+# Allocations made by tracemalloc and the import machinery are noise
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class MemoryTracer:
+    """
+    On-demand tracemalloc tracing against a baseline snapshot
+
+    Tracing slows every allocation down, so it only runs between `start`
+    and `stop`; an idle tracer costs nothing. If tracing was already on
+    (e.g. PYTHONTRACEMALLOC), `stop` leaves it on.
+    """
+
+    def __init__(self):
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+    def start(self, frames: int) -> None:
+        """Start tracing if needed and take a new baseline snapshot"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self._started_tracing = True
+            self._baseline = self._snapshot()
+
+    def stop(self) -> None:
+        """Drop the baseline and stop tracing, if this tracer started it"""
+        with self._lock:
+            self._baseline = None
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def diff(self, limit: int) -> Optional[Dict[str, Any]]:
+        """
+        Compare a new snapshot with the baseline
+
+        Args:
+            limit: Number of allocation sites to report
+
+        Returns:
+            Traced memory and the allocation sites that grew the most since
+            the baseline, or None when not tracing
+        """
+        with self._lock:
+            if self._baseline is None or not tracemalloc.is_tracing():
+                return None
+            snapshot = self._snapshot()
+            baseline = self._baseline
+
+        current, peak = tracemalloc.get_traced_memory()
+        top = snapshot.compare_to(baseline, "traceback")[:limit]
+        return {
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "top": [
+                {
+                    "site": str(stat.traceback[0]),
+                    "traceback": stat.traceback.format(limit=5),
+                    "size_kb": round(stat.size / 1024, 1),
+                    "size_diff_kb": round(stat.size_diff / 1024, 1),
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in top
+            ],
+        }
+
+
+def store_stats() -> Dict[str, Any]:
+    """Sizes and counters of the in-process stores, queues and pools"""
+    return {
+        "session_store": session_store.stats(),
+        "access_token_cache": access_token_cache.stats(),
+        "callback_deduplicator": callback_deduplicator.stats(),
+        "shared_cache": shared_cache.stats(),
+        "providers": {provider.name: provider.stats() for provider in all_providers()},
+        "audit_writer": audit_writer.stats(),
+        "last_login_tracker": last_login_tracker.stats(),
+        "crypto_executor": crypto_executor.stats(),
+        "logging": logging_stats(),
+        "db_pools": {
+            "primary": engine.pool.status(),
+            "replicas": [
+                replica.engine.pool.status() for replica in read_router.replicas
+            ],
+        },
+    }
+
+
+def object_counts(limit: int) -> List[Dict[str, Any]]:
+    """
+    Count live objects tracked by the garbage collector, per type
+
+    Walks the whole heap, so it only runs when asked for.
+    """
+    counts = Counter(type(obj).__qualname__ for obj in gc.get_objects())
+    return [{"type": name, "count": count} for name, count in counts.most_common(limit)]
+
+
+memory_tracer = MemoryTracer()
+
+
+def diagnostics_enabled() -> None:
+    if not settings.DIAGNOSTICS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Diagnostics are disabled",
+        )
+
+
+# The enabled check runs first, so disabled diagnostics don't even verify
+# the session
+_guards = [Depends(diagnostics_enabled), Depends(require_admin)]
+
+
+@router.get("/memory", dependencies=_guards)
+async def memory_report(limit: int = 20, objects: bool = False):
+    """
+    Memory report for this worker
+
+    - Sizes of the in-process stores, queues and pools
+    - With a baseline (POST /diagnostics/memory/baseline), the top allocation
+      sites by growth since then
+    - With `objects=true`, live object counts per type (walks the heap)
+    """
+    limit = min(max(limit, 1), 100)
+    # Snapshots and heap walks take a while; keep them off the event loop
+    report = {
+        "stores": store_stats(),
+        "tracemalloc": await asyncio.to_thread(memory_tracer.diff, limit),
+    }
+    if objects:
+        report["objects"] = await asyncio.to_thread(object_counts, limit)
+    return report
+
+
+@router.post("/memory/baseline", dependencies=_guards)
+async def start_memory_baseline():
+    """Start tracing allocations and take the baseline later reports diff against"""
+    await asyncio.to_thread(memory_tracer.start, settings.DIAGNOSTICS_TRACE_FRAMES)
+    return {"tracing": True}
+
+
+@router.delete("/memory/baseline", dependencies=_guards)
+async def stop_memory_baseline():
+    """Stop tracing allocations"""
+    memory_tracer.stop()
+    return {"tracing": False}
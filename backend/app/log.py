@@ -0,0 +1,327 @@
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+from app.config import settings
+from fastapi import Request, Response
+
+access_logger = logging.getLogger("app.access")
+
+# Per-request access log entry, filled in by the handlers through stage() and
+# set_auth() and written by access_log_middleware
+_request_log: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "request_log", default=None
+)
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["BoundedQueueHandler"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line
+
+    Structured fields passed as `extra={"fields": {...}}` become top-level
+    keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Queue handler that drops records when the queue is full
+
+    The request path never waits for the writer thread; a full queue means
+    the disk can't keep up, and dropping is preferable to adding latency.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler.prepare, keeps the traceback out of the message
+        # so the formatter can put it in its own field
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimiter:
+    """
+    Allow at most `burst` events per key per `interval_seconds`
+
+    The first event allowed in a new interval reports how many events of its
+    key were suppressed in the previous one.
+
+    Args:
+        burst: Events allowed per key and interval
+        interval_seconds: Interval length
+        clock: Monotonic clock, injectable for tests
+    """
+
+    # Bound on tracked keys; past it the windows start over
+    max_keys = 1000
+
+    def __init__(
+        self,
+        burst: int,
+        interval_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.burst = burst
+        self.interval_seconds = interval_seconds
+        self._clock = clock
+        # key -> [window start, count, suppressed]
+        self._windows: Dict[Hashable, list] = {}
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def allow(self, key: Hashable) -> Tuple[bool, int]:
+        """
+        Count an event for `key`
+
+        Returns:
+            Tuple of (allowed, suppressed), where suppressed is the number of
+            events suppressed in the key's previous interval, reported once
+        """
+        now = self._clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval_seconds:
+                if len(self._windows) > self.max_keys:
+                    self._windows.clear()
+                self._windows[key] = [now, 1, 0]
+                return True, window[2] if window else 0
+
+            if window[1] < self.burst:
+                window[1] += 1
+                return True, 0
+            window[2] += 1
+            self.suppressed += 1
+            return False, 0
+
+
+def _add_suppressed(record: logging.LogRecord, suppressed: int) -> None:
+    if suppressed:
+        record.fields = {**getattr(record, "fields", {}), "suppressed": suppressed}
+
+
+class ErrorRateLimitFilter(logging.Filter):
+    """
+    Let at most `burst` identical errors through per `interval_seconds`
+
+    Errors are identical when they come from the same logger with the same
+    message template. The first error of the next interval carries the number
+    suppressed in between. Records below ERROR always pass.
+
+    Args:
+        burst: Errors allowed per interval
+        interval_seconds: Interval length
+        clock: Monotonic clock, injectable for tests
+    """
+
+    def __init__(
+        self,
+        burst: int,
+        interval_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self._limiter = RateLimiter(burst, interval_seconds, clock)
+
+    @property
+    def suppressed(self) -> int:
+        return self._limiter.suppressed
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.ERROR:
+            return True
+
+        allowed, suppressed = self._limiter.allow((record.name, str(record.msg)))
+        _add_suppressed(record, suppressed)
+        return allowed
+
+
+# Error responses bypass sampling but are limited per (path, status), so a
+# 401 or 5xx storm can't flood the queue and crowd out other lines
+error_access_limiter = RateLimiter(
+    settings.LOG_ACCESS_ERROR_BURST, settings.LOG_ERROR_INTERVAL_SECONDS
+)
+
+
+def start_logging() -> None:
+    """
+    Route the app's loggers through a queue to a background writer thread
+
+    Handlers only enqueue; the QueueListener thread formats JSON lines and
+    writes them to LOG_FILE (stdout when unset).
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    if settings.LOG_FILE:
+        handler: logging.Handler = logging.FileHandler(settings.LOG_FILE)
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+
+    log_queue: queue.Queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    queue_handler = BoundedQueueHandler(log_queue)
+    queue_handler.addFilter(
+        ErrorRateLimitFilter(
+            settings.LOG_ERROR_BURST, settings.LOG_ERROR_INTERVAL_SECONDS
+        )
+    )
+
+    app_logger = logging.getLogger("app")
+    app_logger.handlers = [queue_handler]
+    app_logger.setLevel(settings.LOG_LEVEL)
+    app_logger.propagate = False
+
+    _queue_handler = queue_handler
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Write the queued records, stop the writer thread and detach the queue"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+
+    app_logger = logging.getLogger("app")
+    app_logger.removeHandler(_queue_handler)
+    app_logger.propagate = True
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Queue depth and dropped/suppressed record counts of the log pipeline"""
+    if _queue_handler is None:
+        return {"running": False}
+    rate_limit = next(
+        (f for f in _queue_handler.filters if isinstance(f, ErrorRateLimitFilter)),
+        None,
+    )
+    return {
+        "running": True,
+        "queue_depth": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "suppressed": rate_limit.suppressed if rate_limit else 0,
+        "access_errors_suppressed": error_access_limiter.suppressed,
+    }
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a stage of the current request for its access log line"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = _request_log.get()
+        if entry is not None:
+            elapsed = (time.perf_counter() - started) * 1000
+            stages = entry["stages"]
+            stages[name] = round(stages.get(name, 0.0) + elapsed, 2)
+
+
+def set_auth(outcome: str, user_id: Optional[Any] = None) -> None:
+    """Record the auth outcome and user of the current request"""
+    entry = _request_log.get()
+    if entry is not None:
+        entry["auth"] = outcome
+        if user_id is not None:
+            entry["user_id"] = str(user_id)
+
+
+def should_log(path: str, status_code: int) -> Tuple[bool, int]:
+    """
+    Decide whether a request gets an access log line
+
+    Successful requests are sampled per LOG_SAMPLE_RATES; error responses
+    are kept up to LOG_ACCESS_ERROR_BURST per path and status per interval.
+
+    Returns:
+        Tuple of (log, suppressed), where suppressed is the number of error
+        lines for this path and status dropped in the previous interval
+    """
+    if status_code >= 400:
+        return error_access_limiter.allow((path, status_code))
+    rate = settings.LOG_SAMPLE_RATES.get(path, settings.LOG_SAMPLE_DEFAULT_RATE)
+    return rate >= 1 or random.random() < rate, 0
+
+
+async def access_log_middleware(request: Request, call_next) -> Response:
+    """Write one structured access log line per (sampled) request"""
+    entry: Dict[str, Any] = {"stages": {}, "auth": None, "user_id": None}
+    token = _request_log.set(entry)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        _request_log.reset(token)
+        path = request.url.path
+        log_line, suppressed = should_log(path, status_code)
+        if log_line:
+            if suppressed:
+                entry["suppressed"] = suppressed
+            access_logger.info(
+                "%s %s %d",
+                request.method,
+                path,
+                status_code,
+                extra={
+                    "fields": {
+                        "method": request.method,
+                        "path": path,
+                        "status": status_code,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                        "ip": request.client.host if request.client else None,
+                        **entry,
+                    }
+                },
+            )
@@ -1,18 +1,74 @@
-from app.auth.jwt import get_current_user
+import asyncio
+from contextlib import asynccontextmanager
+
+from app.auth.crypto_executor import crypto_executor
+from app.auth.introspect import router as introspect_router
+from app.auth.jwt import get_current_user, get_user_read_db
 from app.auth.oauth import router as oauth_router
+from app.auth.session_store import purge_expired_sessions
+from app.cache import shared_cache
 from app.config import settings
-from app.db.database import Base, engine
+from app.db.audit import audit_writer, get_recent_login_events
+from app.db.database import Base, SessionLocal, engine
+from app.db.last_login import ensure_last_login_column, last_login_tracker
+from app.diagnostics import router as diagnostics_router
+from app.log import access_log_middleware, start_logging, stop_logging
+from app.warmup import warmup
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+# create_all doesn't add columns to existing tables
+ensure_last_login_column(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start warmup and background maintenance tasks, stop them on shutdown"""
+    start_logging()
+    audit_writer.start()
+    last_login_tracker.start()
+
+    tasks = []
+    if settings.WARMUP_ENABLED:
+        # Runs in the background so /health answers while the worker warms up
+        tasks.append(asyncio.create_task(warmup.run(settings.WARMUP_TIMEOUT_SECONDS)))
+    else:
+        warmup.mark_ready()
+
+    if settings.SESSION_MODE == "opaque":
+        tasks.append(
+            asyncio.create_task(
+                purge_expired_sessions(
+                    SessionLocal, settings.SESSION_PURGE_INTERVAL_SECONDS
+                )
+            )
+        )
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+
+    # Flush queued audit events and login times before the worker exits
+    await asyncio.to_thread(audit_writer.stop)
+    await asyncio.to_thread(last_login_tracker.stop)
+    await asyncio.to_thread(crypto_executor.shutdown)
+    shared_cache.close()
+
+    # Last, so shutdown errors above are still written
+    stop_logging()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     description="Google OAuth 2.0 and OpenID Connect implementation",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -24,8 +80,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# One structured access log line per sampled request
+app.middleware("http")(access_log_middleware)
+
 # Include routers
 app.include_router(oauth_router)
+app.include_router(introspect_router)
+app.include_router(diagnostics_router)
 
 
 @app.get("/")
@@ -44,6 +105,29 @@ async def get_my_info(current_user=Depends(get_current_user)):
     return current_user
 
 
+@app.get("/api/me/logins")
+async def get_my_logins(
+    limit: int = 20,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_user_read_db),
+):
+    """Get the current user's recent login events (requires authentication)"""
+    events = get_recent_login_events(
+        db, int(current_user["user_id"]), limit=min(limit, 100)
+    )
+    return [
+        {
+            "provider": event.provider,
+            "ip": event.ip,
+            "user_agent": event.user_agent,
+            "outcome": event.outcome,
+            "latency_ms": event.latency_ms,
+            "created_at": event.created_at,
+        }
+        for event in events
+    ]
+
+
 # For demonstration only - protected endpoint
 @app.get("/api/protected")
 async def protected_route(current_user=Depends(get_current_user)):
@@ -56,3 +140,17 @@ async def protected_route(current_user=Depends(get_current_user)):
 async def health_check():
     """Health check endpoint"""
     return {"status": "ok"}
+
+
+# Readiness check endpoint
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness check endpoint
+
+    Returns 503 with warmup progress until the startup warmup finished, so
+    the load balancer only routes to warm workers. /health stays the
+    liveness check.
+    """
+    status_code = 200 if warmup.ready else 503
+    return JSONResponse(warmup.status(), status_code=status_code)
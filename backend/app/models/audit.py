@@ -0,0 +1,21 @@
+from app.db.database import Base
+from sqlalchemy import Column, DateTime, Index, Integer, String
+
+
+class LoginEvent(Base):
+    __tablename__ = "login_events"
+    # Serves "recent logins for a user" without a sort
+    __table_args__ = (Index("ix_login_events_user_created", "user_id", "created_at"),)
+
+    id = Column(Integer, primary_key=True)
+    # Null when the login failed before the user was known
+    user_id = Column(Integer, nullable=True)
+    provider = Column(String, nullable=True)
+    ip = Column(String(45), nullable=True)
+    user_agent = Column(String(512), nullable=True)
+    outcome = Column(String(16), nullable=False)  # success, failure or error
+    detail = Column(String(512), nullable=True)
+    latency_ms = Column(Integer, nullable=True)
+
+    # Set when the event happens, not when the batch is written
+    created_at = Column(DateTime, nullable=False)
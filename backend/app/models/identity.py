@@ -0,0 +1,18 @@
+from app.db.database import Base
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+
+class UserIdentity(Base):
+    __tablename__ = "user_identities"
+    __table_args__ = (UniqueConstraint("provider", "subject"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+
+    # Registry name of the OIDC provider and its `sub` claim
+    provider = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,22 @@
+from app.db.database import Base
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.sql import func
+
+
+class UserSession(Base):
+    __tablename__ = "user_sessions"
+
+    # SHA-256 of the opaque session id; the raw id only lives in the cookie
+    id = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+
+    # Claims snapshot so a lookup doesn't need to join users
+    email = Column(String, nullable=True)
+    role = Column(String, nullable=False, default="user")
+    name = Column(String, nullable=True)
+    picture = Column(String, nullable=True)
+
+    expires_at = Column(DateTime, index=True, nullable=False)
+
+    # Timestamps
+    created_at = Column(DateTime, server_default=func.now())
@@ -1,5 +1,5 @@
 from app.db.database import Base
-from sqlalchemy import Boolean, Column, DateTime, Integer, String, Text
+from sqlalchemy import Boolean, Column, DateTime, Integer, LargeBinary, String, Text
 from sqlalchemy.sql import func
 
 
@@ -8,12 +8,16 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
-    google_id = Column(String, unique=True, index=True, nullable=False)
+    # Only set for Google accounts; every provider is linked via user_identities
+    google_id = Column(String, unique=True, index=True, nullable=True)
     name = Column(String, nullable=True)
     picture = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
 
     # OAuth specific fields
+    # Encrypted refresh token, see app.auth.utils.seal_refresh_token
+    refresh_token_envelope = Column(LargeBinary, nullable=True)
+    # Legacy base64 format, emptied by app.db.migrate_refresh_tokens
     encrypted_refresh_token = Column(Text, nullable=True)
     refresh_token_iv = Column(
         String, nullable=True
@@ -21,6 +25,9 @@ class User(Base):
     refresh_token_tag = Column(String, nullable=True)  # Authentication tag for AES-GCM
     refresh_token_expires_at = Column(DateTime, nullable=True)
 
+    # Written in batches by app.db.last_login, so it lags by up to one flush
+    last_login_at = Column(DateTime, nullable=True)
+
     # Timestamps
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.auth.crypto_executor import crypto_executor
+from app.auth.providers import OIDCProvider, all_providers
+from app.config import settings
+from app.db.database import engine, read_router
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+def warm_database_pools(engines: List[Engine], connections: int) -> None:
+    """Open `connections` pooled connections per engine so logins don't pay for it"""
+    for db_engine in engines:
+        # Never ask for more than the pool keeps, or connect() would block
+        pool_size = getattr(db_engine.pool, "size", None)
+        count = min(connections, pool_size()) if pool_size else 1
+
+        opened = []
+        try:
+            for _ in range(count):
+                conn = db_engine.connect()
+                opened.append(conn)
+                conn.execute(text("SELECT 1"))
+        finally:
+            # Closing returns the connections to the pool, still open
+            for conn in opened:
+                conn.close()
+
+
+def warm_http_connections(providers: List[OIDCProvider]) -> None:
+    """Resolve metadata and open a keep-alive connection to each token endpoint"""
+    for provider in providers:
+        token_endpoint = provider.metadata()["token_endpoint"]
+        # Any response will do; the TLS connection stays in the session's pool
+        provider.session.head(
+            token_endpoint, timeout=settings.OIDC_HTTP_TIMEOUT_SECONDS
+        )
+
+
+def warm_jwks(providers: List[OIDCProvider]) -> None:
+    """Fetch each provider's JWKS and cache the parsed keys"""
+    for provider in providers:
+        provider.parse_signing_keys()
+
+
+class Warmup:
+    """
+    Startup warmup, run in the background after the app starts
+
+    Each step runs in a worker thread and records its status and duration.
+    The worker is ready once every step finished, failed or the timeout
+    passed: a failed step only means the first requests are slower, not that
+    they fail.
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.duration_seconds: Optional[float] = None
+
+    def mark_ready(self) -> None:
+        self.ready = True
+
+    async def _step(self, name: str, fn: Callable, *args: Any) -> None:
+        self.steps[name] = {"status": "running"}
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(fn, *args)
+            status = {"status": "ok"}
+        except Exception as exc:
+            logger.warning("Warmup step %s failed: %r", name, exc)
+            status = {"status": "failed", "error": repr(exc)}
+        status["seconds"] = round(time.perf_counter() - started, 3)
+        self.steps[name] = status
+
+    async def run(self, timeout_seconds: float) -> None:
+        """Run every warmup step concurrently, then mark the worker ready"""
+        self.ready = False
+        self.started_at = time.time()
+        started = time.perf_counter()
+
+        providers = all_providers()
+        steps = {
+            "database": (
+                warm_database_pools,
+                [engine, *[replica.engine for replica in read_router.replicas]],
+                settings.WARMUP_DB_CONNECTIONS,
+            ),
+            "http": (warm_http_connections, providers),
+            "jwks": (warm_jwks, providers),
+            "crypto": (crypto_executor.warm,),
+        }
+        for name in steps:
+            self.steps[name] = {"status": "pending"}
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(self._step(name, *step) for name, step in steps.items())
+                ),
+                timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            for status in self.steps.values():
+                if status["status"] in ("pending", "running"):
+                    status["status"] = "timed out"
+        finally:
+            self.duration_seconds = round(time.perf_counter() - started, 3)
+            self.ready = True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": "ready" if self.ready else "warming",
+            "started_at": self.started_at,
+            "duration_seconds": self.duration_seconds,
+            "steps": self.steps,
+        }
+
+
+warmup = Warmup()
@@ -1,6 +1,12 @@
+import json
+
 import pytest
-from app.db.database import Base, get_db
+from app.auth.callback_dedup import callback_deduplicator
+from app.auth.jwt import get_user_read_db
+from app.config import settings
+from app.db.database import Base, get_db, get_read_db
 from app.main import app
+from app.models.user import User
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -17,6 +23,48 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+class FakeClock:
+    # 테스트에서 직접 시간을 진행시키는 단조 시계
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+# Google/IdP HTTP 응답 모킹
+class MockResponse:
+    def __init__(self, json_data, status_code=200):
+        self.json_data = json_data
+        self.status_code = status_code
+        self.text = json.dumps(json_data)
+
+    def json(self):
+        return self.json_data
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_user(db):
+    # 테스트 사용자 생성 - 필드는 키워드 인자로 덮어씀
+    def make(**fields):
+        user = User(email="test@example.com", google_id="12345", name="Test User")
+        for field, value in fields.items():
+            setattr(user, field, value)
+        db.add(user)
+        db.commit()
+        return user
+
+    return make
+
+
 @pytest.fixture(scope="function")
 def db():
     # Create the database tables
@@ -33,7 +81,10 @@ def db():
 
 
 @pytest.fixture(scope="function")
-def client(db):
+def client(db, monkeypatch):
+    # 시작 워밍업은 외부 네트워크에 접속하므로 테스트에서는 비활성화
+    monkeypatch.setattr(settings, "WARMUP_ENABLED", False)
+
     # DB 의존성 오버라이드
     def override_get_db():
         try:
@@ -42,6 +93,10 @@ def client(db):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_user_read_db] = override_get_db
+    # 이전 테스트에서 완료된 콜백 결과가 재사용되지 않도록 초기화
+    callback_deduplicator.clear()
     with TestClient(app) as c:
         yield c
     app.dependency_overrides = {}
@@ -0,0 +1,132 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.auth.jwt import create_access_token
+from app.db.audit import AuditWriter, get_recent_login_events
+from app.models.audit import LoginEvent
+from sqlalchemy.orm import sessionmaker
+
+
+def _writer(db, **kwargs):
+    options = {"max_queue": 100, "batch_size": 3, "flush_interval": 60}
+    options.update(kwargs)
+    return AuditWriter(sessionmaker(bind=db.get_bind()), **options)
+
+
+def test_events_are_written_in_batches(db):
+    # 배치 크기 단위로 모아서 기록되는지 확인
+    writer = _writer(db)
+    for i in range(7):
+        writer.record(user_id=i, outcome="success")
+
+    writer.start()
+    writer.stop()
+
+    assert db.query(LoginEvent).count() == 7
+    stats = writer.stats()
+    assert stats["written"] == 7
+    assert stats["flushes"] == 3
+    assert stats["queued"] == 0
+
+
+def test_partial_batch_flushed_after_interval(db):
+    # 배치가 차지 않아도 플러시 간격이 지나면 기록되어야 함
+    writer = _writer(db, batch_size=100, flush_interval=0.05)
+    writer.start()
+    writer.record(user_id=1, outcome="success")
+
+    deadline = time.monotonic() + 2
+    while writer.stats()["written"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.stop()
+
+    assert writer.stats()["written"] == 1
+
+
+def test_full_queue_drops_events(db):
+    # 큐가 가득 차면 이벤트를 버리고 카운트해야 함
+    writer = _writer(db, max_queue=2)
+    assert writer.record(user_id=1, outcome="success")
+    assert writer.record(user_id=1, outcome="success")
+    assert not writer.record(user_id=1, outcome="success")
+
+    writer.stop()
+    assert writer.stats()["dropped"] == 1
+    assert db.query(LoginEvent).count() == 2
+
+
+def test_block_policy_waits_off_the_event_loop(db):
+    # block 정책은 이벤트 루프를 막지 않고 공간이 생길 때까지 기다린 뒤 버림
+    writer = _writer(db, max_queue=1, overflow_policy="block", block_timeout=0.05)
+    assert writer.record(user_id=1, outcome="success")
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        task = asyncio.create_task(ticker())
+        queued = await writer.arecord(user_id=1, outcome="success")
+        task.cancel()
+        return queued, ticks
+
+    queued, ticks = asyncio.run(run())
+    assert not queued
+    # 기다리는 동안에도 다른 코루틴이 실행됨
+    assert ticks > 1
+    writer.stop()
+    assert writer.stats()["dropped"] == 1
+
+
+def test_recent_login_events(db):
+    # 사용자별 최근 로그인 기록 조회 테스트
+    now = datetime.utcnow()
+    for minutes in range(5):
+        db.add(
+            LoginEvent(
+                user_id=1,
+                outcome="success",
+                created_at=now - timedelta(minutes=minutes),
+            )
+        )
+    db.add(LoginEvent(user_id=2, outcome="success", created_at=now))
+    db.commit()
+
+    events = get_recent_login_events(db, 1, limit=3)
+    assert len(events) == 3
+    assert all(event.user_id == 1 for event in events)
+    assert events[0].created_at > events[1].created_at > events[2].created_at
+
+
+def test_failed_callback_is_audited(client):
+    # 실패한 콜백도 감사 이벤트로 기록되어야 함
+    with patch("app.auth.oauth.audit_writer.arecord") as mock_record:
+        client.cookies.set("oauth_state", "other-state")
+        response = client.get(
+            "/oauth/oauth2/callback?code=test-code&state=test-state",
+            headers={"User-Agent": "test-agent"},
+        )
+
+    assert response.status_code == 400
+    event = mock_record.call_args.kwargs
+    assert event["outcome"] == "failure"
+    assert event["detail"] == "Invalid state parameter"
+    assert event["user_agent"] == "test-agent"
+    assert event["latency_ms"] >= 0
+
+
+def test_my_logins_endpoint(client, db):
+    # 로그인 기록 조회 엔드포인트 테스트
+    db.add(LoginEvent(user_id=123, outcome="success", created_at=datetime.utcnow()))
+    db.commit()
+
+    client.cookies.set("session_token", create_access_token({"sub": "123"}))
+    response = client.get("/api/me/logins")
+    assert response.status_code == 200
+    assert [event["outcome"] for event in response.json()] == ["success"]
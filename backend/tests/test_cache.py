@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+import pytest
+from app.cache import MemoryBackend, SharedCache, create_backend
+
+
+def _node(backend=None):
+    return SharedCache(
+        namespace_ttls={"jwks": 3600, "sessions": 60},
+        default_ttl_seconds=300,
+        backend=backend,
+    )
+
+
+def test_without_backend_everything_misses():
+    # 공유 계층이 없으면 저장하지 않고 항상 미스
+    cache = _node()
+    cache.set("jwks", "uri", {"k1": {"kty": "RSA"}})
+
+    assert cache.get("jwks", "uri") is None
+    assert cache.stats()["namespaces"]["jwks"]["misses"] == 1
+
+
+def test_shared_tier_across_nodes(clock):
+    # 한 노드에서 저장한 값을 다른 노드가 공유 계층에서 읽어야 함
+    backend = MemoryBackend(clock=clock)
+    node_a, node_b = _node(backend), _node(backend)
+
+    node_a.set("sessions", "s1", {"sub": "1"})
+    assert node_b.get("sessions", "s1") == {"sub": "1"}
+    assert node_b.stats()["namespaces"]["sessions"]["hits"] == 1
+
+    # 네임스페이스 TTL이 지나면 만료
+    clock.now += 61
+    assert node_a.get("sessions", "s1") is None
+
+
+def test_namespace_ttl_caps_value_ttl(clock):
+    # 값의 TTL은 네임스페이스 TTL을 넘을 수 없음
+    backend = MemoryBackend(clock=clock)
+    cache = _node(backend)
+
+    cache.set("sessions", "long", {"sub": "1"}, ttl_seconds=600)
+    cache.set("sessions", "short", {"sub": "2"}, ttl_seconds=10)
+
+    clock.now += 11
+    assert cache.get("sessions", "short") is None
+    assert cache.get("sessions", "long") == {"sub": "1"}
+    clock.now += 50
+    assert cache.get("sessions", "long") is None
+
+
+def test_invalidation_reaches_other_nodes():
+    # 무효화는 다른 모든 노드의 리스너에 전달되어야 함
+    backend = MemoryBackend()
+    node_a, node_b = _node(backend), _node(backend)
+    evicted = []
+    node_b.on_invalidate("sessions", evicted.append)
+
+    node_a.set("sessions", "s1", {"sub": "1"})
+    node_a.invalidate("sessions", "s1")
+    assert node_b.get("sessions", "s1") is None
+    assert evicted == ["s1", "s1"]
+    assert node_b.stats()["namespaces"]["sessions"]["invalidations_received"] == 2
+
+    # 자신이 보낸 무효화는 무시
+    own = []
+    node_a.on_invalidate("sessions", own.append)
+    node_a.invalidate("sessions", "s2")
+    assert own == []
+
+
+def test_async_calls_run_off_the_event_loop():
+    # 비동기 호출은 백엔드 I/O를 작업 스레드에서 실행
+    calls = []
+
+    class RecordingBackend(MemoryBackend):
+        def get(self, key):
+            calls.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value, ttl_seconds):
+            calls.append(threading.get_ident())
+            super().set(key, value, ttl_seconds)
+
+    cache = _node(RecordingBackend())
+
+    async def run():
+        await cache.aset("sessions", "s1", {"sub": "1"})
+        value = await cache.aget("sessions", "s1")
+        await cache.ainvalidate("sessions", "s1")
+        return value, threading.get_ident()
+
+    value, loop_thread = asyncio.run(run())
+    assert value == {"sub": "1"}
+    assert len(calls) == 2
+    assert loop_thread not in calls
+
+
+def test_backend_errors_fall_back():
+    # 공유 계층 장애 시 예외 없이 미스로 처리되어야 함
+    class BrokenBackend(MemoryBackend):
+        def get(self, key):
+            raise ConnectionError("down")
+
+        def set(self, key, value, ttl_seconds):
+            raise ConnectionError("down")
+
+    cache = _node(BrokenBackend())
+    cache.set("jwks", "uri", {"k1": {}})
+    assert cache.get("jwks", "uri") is None
+    assert cache.stats()["namespaces"]["jwks"]["backend_errors"] == 2
+
+
+def test_create_backend():
+    # URL 스킴에 따라 백엔드를 선택
+    assert create_backend(None) is None
+    assert isinstance(create_backend("memory://"), MemoryBackend)
+    with pytest.raises(ValueError):
+        create_backend("memcached://localhost")
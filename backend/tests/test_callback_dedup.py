@@ -0,0 +1,114 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from app.auth.callback_dedup import CallbackDeduplicator, callback_key
+from app.auth.providers import get_provider
+from conftest import MockResponse
+from fastapi import HTTPException
+
+
+def test_concurrent_duplicates_share_one_login():
+    # 같은 코드의 동시 콜백은 한 번만 로그인해야 함
+    dedup = CallbackDeduplicator(ttl_seconds=60, max_entries=10)
+    calls = []
+
+    async def login():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return (1, "session-token")
+
+    async def run():
+        return await asyncio.gather(*(dedup.run("key", login) for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert calls == [1]
+    assert [result for result, _ in results] == [(1, "session-token")] * 3
+    assert sorted(duplicate for _, duplicate in results) == [False, True, True]
+    assert dedup.stats()["coalesced"] == 2
+
+
+def test_completed_results_expire(clock):
+    # 완료된 결과는 TTL 동안만 재사용
+    dedup = CallbackDeduplicator(ttl_seconds=60, max_entries=10, clock=clock)
+
+    async def login():
+        return "first"
+
+    assert asyncio.run(dedup.run("key", login)) == ("first", False)
+    assert asyncio.run(dedup.run("key", login)) == ("first", True)
+
+    clock.now += 61
+    assert asyncio.run(dedup.run("key", login)) == ("first", False)
+    assert dedup.stats()["replayed"] == 1
+
+
+def test_failures_are_replayed_but_errors_are_not():
+    # HTTPException은 재사용하고, 예기치 못한 오류는 재시도 가능해야 함
+    dedup = CallbackDeduplicator(ttl_seconds=60, max_entries=10)
+
+    async def rejected():
+        raise HTTPException(status_code=400, detail="Token exchange failed")
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return "ok"
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            asyncio.run(dedup.run("rejected", rejected))
+    assert dedup.stats()["logins"] == 1
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(dedup.run("broken", broken))
+    assert asyncio.run(dedup.run("broken", ok)) == ("ok", False)
+
+
+def test_completed_results_are_bounded():
+    # 최대 개수를 넘으면 가장 오래된 결과부터 제거
+    dedup = CallbackDeduplicator(ttl_seconds=60, max_entries=2)
+
+    async def login():
+        return "ok"
+
+    for key in ("a", "b", "c"):
+        asyncio.run(dedup.run(key, login))
+    assert dedup.stats()["completed"] == 2
+    assert dedup.stats()["evictions"] == 1
+
+
+def test_callback_key_depends_on_nonce():
+    # 논스 쿠키가 다르면 다른 키여야 함
+    assert callback_key("google", "code", "n1") == callback_key("google", "code", "n1")
+    assert callback_key("google", "code", "n1") != callback_key("google", "code", "n2")
+    assert "code" not in callback_key("google", "code", "n1")
+
+
+def test_duplicate_callback_exchanges_code_once(client, db):
+    # 같은 코드로 두 번 콜백해도 토큰 교환은 한 번만 해야 함
+    with patch(
+        "app.auth.oauth.averify_id_token",
+        return_value={
+            "sub": "12345",
+            "email": "test@example.com",
+            "nonce": "test-nonce",
+        },
+    ), patch.object(
+        get_provider("google").session,
+        "post",
+        return_value=MockResponse(
+            {"access_token": "test-access-token", "id_token": "test-id-token"}, 200
+        ),
+    ) as mock_post:
+        for _ in range(2):
+            client.cookies.set("oauth_state", "test-state")
+            client.cookies.set("oauth_nonce", "test-nonce")
+            response = client.get(
+                "/oauth/oauth2/callback?code=test-code&state=test-state",
+                follow_redirects=False,
+            )
+            assert response.status_code == 302
+
+    assert mock_post.call_count == 1
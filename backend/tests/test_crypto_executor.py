@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+import pytest
+from app.auth.crypto_executor import (
+    CryptoExecutor,
+    aread_refresh_token,
+    aseal_refresh_token,
+)
+from app.auth.jwt import acreate_access_token, averify_token
+from app.models.user import User
+from fastapi import HTTPException
+
+
+def _executor(**kwargs):
+    options = {
+        "mode": "thread",
+        "max_workers": 2,
+        "max_pending": 8,
+        "offload_threshold_us": 100,
+    }
+    options.update(kwargs)
+    return CryptoExecutor(**options)
+
+
+def _thread_name():
+    return threading.current_thread().name
+
+
+def test_cheap_work_runs_inline():
+    # 임계값 미만의 작업은 이벤트 루프 스레드에서 실행
+    executor = _executor()
+    name = asyncio.run(executor.run(_thread_name, cost=10))
+
+    assert name == threading.current_thread().name
+    assert executor.stats()["inline"] == 1
+    assert executor.stats()["offloaded"] == 0
+
+
+def test_expensive_work_is_offloaded():
+    # 임계값 이상의 작업은 전용 스레드 풀에서 실행
+    executor = _executor()
+    name = asyncio.run(executor.run(_thread_name, cost=110))
+    executor.shutdown()
+
+    assert name.startswith("crypto")
+    stats = executor.stats()
+    assert stats["offloaded"] == 1
+    assert stats["completed"] == 1
+    assert stats["inflight"] == 0
+    assert stats["exec_seconds_total"] >= 0
+
+
+def test_inline_mode_never_offloads():
+    # inline 모드는 비용과 관계없이 호출 스레드에서 실행
+    executor = _executor(mode="inline")
+    name = asyncio.run(executor.run(_thread_name, cost=10_000))
+    assert name == threading.current_thread().name
+
+
+def test_overflow_runs_on_caller():
+    # 대기 작업이 한도에 도달하면 호출자가 직접 실행
+    executor = _executor(max_workers=1, max_pending=1)
+    release = threading.Event()
+
+    async def run():
+        blocked = asyncio.ensure_future(executor.run(release.wait, 5, cost=110))
+        await asyncio.sleep(0.05)
+        name = await executor.run(_thread_name, cost=110)
+        release.set()
+        await blocked
+        return name
+
+    assert asyncio.run(run()) == threading.current_thread().name
+    executor.shutdown()
+    assert executor.stats()["overflow"] == 1
+    assert executor.stats()["max_inflight"] == 1
+
+
+def test_async_wrappers_round_trip():
+    # 비동기 래퍼가 동기 함수와 같은 결과를 내야 함
+    async def run():
+        token = await acreate_access_token({"sub": "123"})
+        claims = await averify_token(token)
+        user = User(refresh_token_envelope=await aseal_refresh_token("refresh-token"))
+        return claims, await aread_refresh_token(user)
+
+    claims, refresh_token = asyncio.run(run())
+    assert claims["sub"] == "123"
+    assert refresh_token == "refresh-token"
+
+    with pytest.raises(HTTPException):
+        asyncio.run(averify_token("invalid.jwt.token"))
@@ -0,0 +1,122 @@
+import pytest
+from app.db.database import Base, ReadRouter
+from app.models.user import User
+from conftest import FakeClock
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def databases(tmp_path):
+    # 기본 DB와 복제본 역할을 하는 두 개의 SQLite 파일
+    urls = {}
+    for role in ("primary", "replica"):
+        url = f"sqlite:///{tmp_path / role}.db"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        db.add(User(email="test@example.com", google_id="12345", name=role))
+        db.commit()
+        db.close()
+        engine.dispose()
+        urls[role] = url
+    return urls
+
+
+def _read_name(router, sticky_key=None):
+    sessions = router.session(sticky_key)
+    db = next(sessions)
+    try:
+        return db.query(User).one().name
+    finally:
+        sessions.close()
+
+
+def _router(databases, clock, replica_urls=None):
+    primary = sessionmaker(bind=create_engine(databases["primary"]))
+    return ReadRouter(
+        primary,
+        replica_urls or [databases["replica"]],
+        retry_seconds=30,
+        sticky_seconds=5,
+        clock=clock,
+    )
+
+
+def test_reads_go_to_replica(databases):
+    # 읽기 세션은 복제본에서 처리되어야 함
+    router = _router(databases, FakeClock())
+    assert _read_name(router) == "replica"
+
+
+def test_read_your_writes_sticks_to_primary(databases, clock):
+    # 자신의 쓰기 직후에는 기본 DB에서 읽어야 함
+    router = _router(databases, clock)
+
+    router.mark_written("1")
+    assert _read_name(router, sticky_key="1") == "primary"
+    assert _read_name(router, sticky_key="2") == "replica"
+
+    clock.now += 6
+    assert _read_name(router, sticky_key="1") == "replica"
+
+
+def test_expired_pins_are_pruned(databases, clock):
+    # 만료된 고정은 쓰기 때마다 앞에서부터 정리되어야 함
+    router = _router(databases, clock)
+
+    for key in ("1", "2", "3"):
+        router.mark_written(key)
+        clock.now += 2
+    # "1"을 다시 쓰면 맨 뒤로 이동
+    router.mark_written("1")
+    assert list(router._sticky) == ["2", "3", "1"]
+
+    clock.now += 4
+    router.mark_written("4")
+    assert list(router._sticky) == ["1", "4"]
+    assert router.is_sticky("1")
+    assert not router.is_sticky("2")
+
+
+def test_unhealthy_replica_is_skipped(databases, tmp_path, clock):
+    # 실패한 복제본은 재시도 시간 동안 제외되고 이후 다시 확인되어야 함
+    router = _router(databases, clock)
+    replica = router.replicas[0]
+
+    sessions = router.session()
+    next(sessions)
+    with pytest.raises(OperationalError):
+        sessions.throw(OperationalError("SELECT 1", {}, Exception("down")))
+    assert replica.unhealthy_until > clock.now
+
+    assert _read_name(router) == "primary"
+
+    clock.now += 31
+    assert _read_name(router) == "replica"
+
+
+def test_round_robin_across_replicas(databases):
+    # 여러 복제본에 번갈아 분배되어야 함
+    router = _router(
+        databases, FakeClock(), [databases["replica"], databases["primary"]]
+    )
+    assert [router.choose().url for _ in range(4)] == [
+        databases["replica"],
+        databases["primary"],
+        databases["replica"],
+        databases["primary"],
+    ]
+
+
+def test_no_replicas_reads_from_primary(databases):
+    # 복제본이 없으면 기본 DB를 사용
+    router = ReadRouter(
+        sessionmaker(bind=create_engine(databases["primary"])),
+        [],
+        retry_seconds=30,
+        sticky_seconds=5,
+    )
+    assert router.choose() is None
+    assert _read_name(router) == "primary"
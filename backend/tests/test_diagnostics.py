@@ -0,0 +1,75 @@
+import tracemalloc
+
+import pytest
+from app.auth.jwt import create_access_token
+from app.config import settings
+from app.diagnostics import MemoryTracer, memory_tracer
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(settings, "DIAGNOSTICS_ENABLED", True)
+    yield
+    memory_tracer.stop()
+
+
+def login(client, role):
+    token = create_access_token({"sub": "1", "email": "a@example.com", "role": role})
+    client.cookies.set("session_token", token)
+
+
+def test_disabled_by_default(client):
+    # 비활성화 상태에서는 관리자라도 접근 불가
+    login(client, "admin")
+    response = client.get("/diagnostics/memory")
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Diagnostics are disabled"
+
+
+def test_requires_admin_role(client, enabled):
+    # 로그인하지 않았거나 admin 역할이 아니면 거부
+    assert client.get("/diagnostics/memory").status_code in (401, 403)
+
+    login(client, "user")
+    response = client.get("/diagnostics/memory")
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Admin role required"
+
+
+def test_memory_report(client, enabled):
+    # 저장소 크기를 보고하고, 기준점 이후에는 할당 위치 차이도 보고
+    login(client, "admin")
+
+    report = client.get("/diagnostics/memory").json()
+    assert report["tracemalloc"] is None
+    assert "entries" in report["stores"]["session_store"]
+    assert "queued" in report["stores"]["audit_writer"]
+    assert "objects" not in report
+
+    assert client.post("/diagnostics/memory/baseline").json() == {"tracing": True}
+    report = client.get("/diagnostics/memory?limit=5&objects=true").json()
+    assert len(report["tracemalloc"]["top"]) <= 5
+    assert report["tracemalloc"]["traced_kb"] > 0
+    assert len(report["objects"]) == 5
+
+    assert client.delete("/diagnostics/memory/baseline").json() == {"tracing": False}
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracer_reports_growth():
+    # 기준점 이후 늘어난 할당이 상위에 보고됨
+    tracer = MemoryTracer()
+    assert tracer.diff(10) is None
+
+    tracer.start(frames=1)
+    try:
+        retained = [bytearray(1024) for _ in range(1000)]
+        report = tracer.diff(1)
+    finally:
+        tracer.stop()
+
+    assert report["top"][0]["size_diff_kb"] >= 1000
+    assert report["top"][0]["count_diff"] >= 1000
+    assert "test_diagnostics.py" in report["top"][0]["site"]
+    assert len(retained) == 1000
+    assert tracer.diff(10) is None
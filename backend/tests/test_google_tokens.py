@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from app.auth.google_tokens import AccessTokenCache, AccessTokenUnavailable
+from app.auth.providers import get_provider
+from app.auth.utils import encrypt_refresh_token
+from app.models.user import User
+from conftest import FakeClock, MockResponse
+from sqlalchemy.orm import sessionmaker
+
+
+def _cache(db=None, clock=None, **kwargs):
+    options = {
+        "max_entries": 10,
+        "refresh_ahead_seconds": 300,
+        "expiry_skew_seconds": 30,
+        "session_factory": sessionmaker(bind=db.get_bind()) if db else None,
+        "clock": clock or FakeClock(),
+    }
+    options.update(kwargs)
+    return AccessTokenCache(**options)
+
+
+def test_hit_and_expiry(clock):
+    # 만료 전에는 캐시에서, 만료 후에는 새로 가져와야 함
+    cache = _cache(clock=clock)
+    cache.put(1, "cached-token", expires_in=3600)
+
+    with patch.object(cache, "_fetch", return_value=("new-token", 3600)) as fetch:
+        assert asyncio.run(cache.get(1)) == "cached-token"
+        fetch.assert_not_called()
+
+        clock.now += 3600
+        assert asyncio.run(cache.get(1)) == "new-token"
+        fetch.assert_called_once_with(1)
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_concurrent_misses_share_one_refresh():
+    # 같은 사용자의 동시 요청은 한 번만 갱신해야 함
+    cache = _cache()
+    calls = []
+
+    def slow_fetch(user_id):
+        calls.append(user_id)
+        time.sleep(0.05)
+        return "new-token", 3600
+
+    async def run():
+        with patch.object(cache, "_fetch", side_effect=slow_fetch):
+            return await asyncio.gather(*(cache.get(1) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["new-token"] * 5
+    assert calls == [1]
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_cancelled_refresh_releases_waiters():
+    # 갱신 중인 요청이 취소되어도 합류한 요청이 무한정 기다리지 않아야 함
+    cache = _cache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_fetch(user_id):
+        started.set()
+        release.wait(5)
+        return "new-token", 3600
+
+    async def run():
+        with patch.object(cache, "_fetch", side_effect=slow_fetch):
+            owner = asyncio.create_task(cache.get(1))
+            await asyncio.to_thread(started.wait, 5)
+            waiter = asyncio.create_task(cache.get(1))
+            await asyncio.sleep(0)
+            owner.cancel()
+            try:
+                with pytest.raises(asyncio.CancelledError):
+                    await asyncio.wait_for(waiter, 1)
+            finally:
+                release.set()
+
+    asyncio.run(run())
+    assert cache.stats()["inflight"] == 0
+
+
+def test_refresh_ahead_serves_current_token():
+    # 만료가 가까우면 현재 토큰을 주고 백그라운드에서 갱신
+    cache = _cache()
+    cache.put(1, "old-token", expires_in=100)
+
+    async def run():
+        with patch.object(cache, "_fetch", return_value=("new-token", 3600)):
+            token = await cache.get(1)
+            await asyncio.gather(*cache._background)
+            return token
+
+    assert asyncio.run(run()) == "old-token"
+    assert cache._entries[1].access_token == "new-token"
+    assert cache.stats()["refresh_ahead"] == 1
+
+
+def test_entries_are_bounded():
+    # 최대 개수를 넘으면 가장 오래된 항목부터 제거
+    cache = _cache(max_entries=2)
+    for user_id in range(3):
+        cache.put(user_id, f"token-{user_id}", 3600)
+
+    assert len(cache) == 2
+    assert 0 not in cache._entries
+    assert cache.stats()["evictions"] == 1
+
+
+def test_miss_decrypts_refresh_token(db):
+    # 캐시 미스 시 저장된 리프레시 토큰을 복호화해 갱신해야 함
+    token, iv, tag = encrypt_refresh_token("stored-refresh-token")
+    user = User(
+        email="test@example.com",
+        google_id="12345",
+        encrypted_refresh_token=token,
+        refresh_token_iv=iv,
+        refresh_token_tag=tag,
+    )
+    db.add(user)
+    db.commit()
+
+    cache = _cache(db)
+    with patch.object(
+        get_provider("google").session,
+        "post",
+        return_value=MockResponse({"access_token": "fresh", "expires_in": 3599}, 200),
+    ) as mock_post:
+        assert asyncio.run(cache.get(user.id)) == "fresh"
+
+    assert mock_post.call_args.kwargs["data"]["refresh_token"] == (
+        "stored-refresh-token"
+    )
+
+    with pytest.raises(AccessTokenUnavailable):
+        asyncio.run(cache.get(user.id + 1))
+    assert cache.stats()["errors"] == 1
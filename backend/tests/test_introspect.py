@@ -0,0 +1,130 @@
+import asyncio
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from app.auth.crypto_executor import crypto_executor
+from app.auth.introspect import cache_max_age
+from app.auth.jwt import create_access_token
+from app.auth.session_store import SessionStore, hash_session_id, session_store
+from app.config import settings
+from app.models.user import User
+
+
+@pytest.fixture
+def introspection_secret(monkeypatch):
+    monkeypatch.setattr(settings, "INTROSPECTION_SECRET", "internal-secret")
+    return {"Authorization": "Bearer internal-secret"}
+
+
+def test_introspect_requires_credentials(client, introspection_secret):
+    # 자격 증명 없이 호출하면 거부되어야 함
+    response = client.post("/oauth/introspect", json={"tokens": []})
+    assert response.status_code == 401
+
+    response = client.post(
+        "/oauth/introspect",
+        json={"tokens": []},
+        headers={"Authorization": "Bearer wrong"},
+    )
+    assert response.status_code == 401
+
+
+def test_introspect_batch(client, introspection_secret):
+    # 유효/무효 토큰이 섞인 배치 테스트
+    token = create_access_token(
+        {"sub": "123", "email": "test@example.com", "role": "user"},
+        expires_delta=timedelta(minutes=5),
+    )
+
+    response = client.post(
+        "/oauth/introspect",
+        json={"tokens": [token, "invalid.jwt.token", "unknown-opaque-id"]},
+        headers=introspection_secret,
+    )
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert results[0]["active"] is True
+    assert results[0]["sub"] == "123"
+    assert results[0]["email"] == "test@example.com"
+    assert results[1] == {"active": False}
+    assert results[2] == {"active": False}
+
+    # 캐시 시간은 남은 토큰 수명을 넘지 않아야 함
+    max_age = int(response.headers["Cache-Control"].split("max-age=")[1])
+    assert 0 < max_age <= settings.INTROSPECTION_MAX_CACHE_SECONDS
+
+
+def test_introspect_large_batch_offloaded(client, introspection_secret):
+    # 큰 배치는 암호화 실행기에서 검증되어도 순서가 유지되어야 함
+    offloaded = crypto_executor.stats()["offloaded"]
+    tokens = [create_access_token({"sub": str(i)}) for i in range(10)]
+
+    response = client.post(
+        "/oauth/introspect", json={"tokens": tokens}, headers=introspection_secret
+    )
+    assert response.status_code == 200
+    assert [r["sub"] for r in response.json()["results"]] == [str(i) for i in range(10)]
+    assert crypto_executor.stats()["offloaded"] > offloaded
+
+
+def test_introspect_opaque_sessions_batched(client, db, introspection_secret):
+    # 불투명 세션 미스는 이벤트 루프 밖에서 한 번에 조회되어야 함
+    user = User(email="test@example.com", google_id="12345", name="Test User")
+    db.add(user)
+    db.commit()
+    session_ids = [
+        session_store.create(db, user.id, user.email, "user", None, None)
+        for _ in range(3)
+    ]
+    for session_id in session_ids:
+        session_store.evict(hash_session_id(session_id))
+
+    on_loop = []
+
+    def load_many(db, keys):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return SessionStore._load_many(session_store, db, keys)
+
+    with patch.object(session_store, "_load_many", side_effect=load_many):
+        response = client.post(
+            "/oauth/introspect",
+            json={"tokens": [*session_ids, "unknown-opaque-id"]},
+            headers=introspection_secret,
+        )
+
+    results = response.json()["results"]
+    assert [r["active"] for r in results] == [True, True, True, False]
+    assert results[0]["sub"] == str(user.id)
+    assert on_loop == [False]
+
+
+def test_introspect_batch_limit(client, introspection_secret, monkeypatch):
+    # 최대 배치 크기 초과 테스트
+    monkeypatch.setattr(settings, "INTROSPECTION_MAX_BATCH", 2)
+    response = client.post(
+        "/oauth/introspect",
+        json={"tokens": ["a", "b", "c"]},
+        headers=introspection_secret,
+    )
+    assert response.status_code == 400
+
+
+def test_cache_max_age():
+    # 가장 짧은 남은 수명이 캐시 시간의 상한
+    now = time.time()
+    results = [
+        {"active": True, "exp": now + 30},
+        {"active": True, "exp": now + 600},
+        {"active": False},
+    ]
+    assert cache_max_age(results, now) == 30
+    assert cache_max_age([{"active": False}], now) == (
+        settings.INTROSPECTION_MAX_CACHE_SECONDS
+    )
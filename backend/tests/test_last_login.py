@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.auth.oauth import _update_profile
+from app.auth.providers import get_provider
+from app.auth.utils import seal_refresh_token
+from app.db.last_login import LastLoginTracker, ensure_last_login_column
+from app.models.identity import UserIdentity
+from conftest import MockResponse
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+
+def test_update_profile_skips_unchanged_fields(db, make_user):
+    # 변경되지 않은 프로필은 세션을 더럽히지 않아야 함
+    user = make_user()
+
+    assert not _update_profile(user, "test@example.com", "Test User", None)
+    assert not db.dirty
+
+    assert _update_profile(user, "test@example.com", "New Name", None)
+    assert user in db.dirty
+
+
+def test_tracker_batches_last_login_updates(db, make_user):
+    # 같은 사용자의 반복 로그인은 한 번의 갱신으로 합쳐져야 함
+    user = make_user()
+    updated_at = user.updated_at
+    tracker = LastLoginTracker(
+        sessionmaker(bind=db.get_bind()), flush_interval=60, max_pending=100
+    )
+
+    first = datetime(2026, 1, 1, 12, 0)
+    tracker.touch(user.id, first + timedelta(minutes=5))
+    tracker.touch(user.id, first)
+    tracker.touch(user.id, first + timedelta(minutes=1))
+    assert len(tracker) == 1
+
+    assert tracker.flush() == 1
+    db.expire_all()
+    assert user.last_login_at == first + timedelta(minutes=5)
+    # 로그인 시각 기록은 프로필 변경이 아니므로 updated_at은 그대로
+    assert user.updated_at == updated_at
+    assert tracker.stats() == {
+        "touched": 3,
+        "written": 1,
+        "failed": 0,
+        "flushes": 1,
+        "pending": 0,
+    }
+
+
+def test_returning_user_login_skips_update(client, db, make_user):
+    # 프로필과 리프레시 토큰이 같으면 users 테이블에 UPDATE가 없어야 함
+    user = make_user(
+        picture="https://example.com/photo.jpg",
+        refresh_token_envelope=seal_refresh_token("test-refresh-token"),
+    )
+    db.add(UserIdentity(user_id=user.id, provider="google", subject="12345"))
+    db.commit()
+
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with patch(
+            "app.auth.oauth.averify_id_token",
+            return_value={
+                "sub": "12345",
+                "email": "test@example.com",
+                "name": "Test User",
+                "picture": "https://example.com/photo.jpg",
+            },
+        ), patch.object(
+            get_provider("google").session,
+            "post",
+            return_value=MockResponse(
+                {
+                    "access_token": "test-access-token",
+                    "id_token": "test-id-token",
+                    "refresh_token": "test-refresh-token",
+                },
+                200,
+            ),
+        ), patch(
+            "app.auth.oauth.last_login_tracker.touch"
+        ) as mock_touch:
+            client.cookies.set("oauth_state", "test-state")
+            response = client.get(
+                "/oauth/oauth2/callback?code=test-code&state=test-state",
+                follow_redirects=False,
+            )
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert response.status_code == 302
+    assert not [s for s in statements if s.lstrip().upper().startswith("UPDATE")]
+    mock_touch.assert_called_once_with(user.id)
+
+
+def test_ensure_last_login_column(tmp_path):
+    # 이전 스키마의 users 테이블에 컬럼이 추가되어야 함
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY)"))
+
+    ensure_last_login_column(engine)
+    ensure_last_login_column(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("users")}
+    assert "last_login_at" in columns
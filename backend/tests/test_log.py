@@ -0,0 +1,153 @@
+import json
+import logging
+import queue
+
+from app import log
+from app.config import settings
+from app.log import (
+    BoundedQueueHandler,
+    ErrorRateLimitFilter,
+    JsonFormatter,
+    RateLimiter,
+    should_log,
+)
+
+
+def make_record(level=logging.ERROR, msg="boom %s", args=("x",), **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    for name, value in extra.items():
+        setattr(record, name, value)
+    return record
+
+
+def test_json_formatter_includes_fields():
+    # 구조화 필드는 JSON 최상위 키로 출력
+    record = make_record(logging.INFO, fields={"path": "/health", "status": 200})
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["message"] == "boom x"
+    assert entry["path"] == "/health"
+    assert entry["status"] == 200
+
+
+def test_queue_handler_drops_when_full():
+    # 큐가 가득 차면 대기하지 않고 버림
+    handler = BoundedQueueHandler(queue.Queue(1))
+    handler.handle(make_record())
+    handler.handle(make_record())
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+
+def test_queue_handler_keeps_traceback_separate():
+    # 예외 트레이스백은 메시지가 아닌 별도 필드로 전달
+    handler = BoundedQueueHandler(queue.Queue())
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        logging.getLogger("app.test").addHandler(handler)
+        try:
+            logging.getLogger("app.test").exception("failed")
+        finally:
+            logging.getLogger("app.test").removeHandler(handler)
+
+    entry = json.loads(JsonFormatter().format(handler.queue.get_nowait()))
+    assert entry["message"] == "failed"
+    assert "ValueError: bad" in entry["exc"]
+
+
+def test_error_rate_limit(clock):
+    # 같은 에러는 구간당 burst 개까지만 통과하고, 다음 구간에 억제 수를 기록
+    limiter = ErrorRateLimitFilter(burst=2, interval_seconds=60, clock=clock)
+
+    passed = [limiter.filter(make_record()) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert limiter.suppressed == 3
+
+    # 다른 메시지나 ERROR 미만은 영향 없음
+    assert limiter.filter(make_record(msg="other"))
+    assert limiter.filter(make_record(logging.WARNING))
+
+    clock.now += 60
+    record = make_record()
+    assert limiter.filter(record)
+    assert record.fields == {"suppressed": 3}
+
+
+def test_should_log_sampling(monkeypatch):
+    # 에러는 샘플링하지 않고, 나머지는 경로별 비율로 샘플링
+    monkeypatch.setattr(settings, "LOG_SAMPLE_RATES", {"/health": 0.0})
+    monkeypatch.setattr(settings, "LOG_SAMPLE_DEFAULT_RATE", 1.0)
+    monkeypatch.setattr(log, "error_access_limiter", RateLimiter(10, 60))
+
+    assert should_log("/health", 200) == (False, 0)
+    assert should_log("/health", 500) == (True, 0)
+    assert should_log("/api/me", 200) == (True, 0)
+
+
+def test_error_access_lines_rate_limited(monkeypatch, clock):
+    # 에러 응답은 (경로, 상태)별로 구간당 burst 개까지만 기록하고,
+    # 다음 구간의 첫 줄에 억제 수를 기록
+    monkeypatch.setattr(log, "error_access_limiter", RateLimiter(2, 60, clock))
+
+    logged = [should_log("/api/me", 401)[0] for _ in range(5)]
+    assert logged == [True, True, False, False, False]
+    # 다른 상태나 경로는 별도로 계산
+    assert should_log("/api/me", 500) == (True, 0)
+    assert should_log("/api/other", 401) == (True, 0)
+    assert log.error_access_limiter.suppressed == 3
+
+    clock.now += 60
+    assert should_log("/api/me", 401) == (True, 3)
+    assert should_log("/api/me", 401) == (True, 0)
+
+
+def test_access_log_line(client, monkeypatch):
+    # 요청마다 단계별 시간과 인증 결과를 담은 접근 로그 한 줄을 남김
+    records = []
+    monkeypatch.setattr(log.access_logger, "handle", records.append)
+
+    monkeypatch.setattr(log, "error_access_limiter", RateLimiter(10, 60))
+
+    client.cookies.set("session_token", "invalid")
+    response = client.get("/api/me")
+    assert response.status_code == 401
+
+    assert len(records) == 1
+    fields = records[0].fields
+    assert fields["method"] == "GET"
+    assert fields["path"] == "/api/me"
+    assert fields["status"] == 401
+    assert fields["auth"] == "invalid"
+    assert "auth" in fields["stages"]
+    assert fields["duration_ms"] >= 0
+
+
+def test_health_checks_not_logged(client, monkeypatch):
+    # 헬스 체크는 기본 설정에서 기록하지 않음
+    records = []
+    monkeypatch.setattr(log.access_logger, "handle", records.append)
+
+    assert client.get("/health").status_code == 200
+    assert records == []
+
+
+def test_access_log_line_carries_suppressed_count(client, monkeypatch, clock):
+    # 억제된 에러 접근 로그 수는 다음에 기록되는 줄에 포함
+    records = []
+    monkeypatch.setattr(log.access_logger, "handle", records.append)
+    monkeypatch.setattr(log, "error_access_limiter", RateLimiter(1, 60, clock))
+
+    client.cookies.set("session_token", "invalid")
+    for _ in range(3):
+        assert client.get("/api/me").status_code == 401
+    assert len(records) == 1
+    assert "suppressed" not in records[0].fields
+
+    clock.now += 60
+    assert client.get("/api/me").status_code == 401
+    assert len(records) == 2
+    assert records[1].fields["suppressed"] == 2
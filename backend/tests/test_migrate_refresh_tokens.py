@@ -0,0 +1,67 @@
+import logging
+
+from app.auth.utils import encrypt_refresh_token, read_refresh_token
+from app.db.migrate_refresh_tokens import (
+    ensure_envelope_column,
+    migrate_refresh_tokens,
+)
+from app.models.user import User
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+
+def _legacy_user(index, refresh_token):
+    token, iv, tag = encrypt_refresh_token(refresh_token)
+    return User(
+        email=f"user{index}@example.com",
+        google_id=str(index),
+        encrypted_refresh_token=token,
+        refresh_token_iv=iv,
+        refresh_token_tag=tag,
+    )
+
+
+def test_migrate_in_batches(db, caplog):
+    # 여러 배치에 걸쳐 모든 기존 토큰이 봉투 형식으로 변환되어야 함
+    for index in range(5):
+        db.add(_legacy_user(index, f"refresh-{index}"))
+    db.add(User(email="no-token@example.com", google_id="99"))
+    broken = _legacy_user(6, "broken")
+    broken.refresh_token_tag = encrypt_refresh_token("other")[2]
+    db.add(broken)
+    db.commit()
+
+    session_factory = sessionmaker(bind=db.get_bind())
+    with caplog.at_level(logging.INFO, logger="app.db.migrate_refresh_tokens"):
+        assert migrate_refresh_tokens(session_factory, batch_size=2) == 5
+    assert f"refresh token of user {broken.id}" in caplog.text
+    assert "Converted 5 refresh tokens" in caplog.text
+    db.expire_all()
+
+    for index in range(5):
+        user = db.query(User).filter(User.google_id == str(index)).one()
+        assert user.refresh_token_envelope is not None
+        assert user.encrypted_refresh_token is None
+        assert user.refresh_token_iv is None
+        assert user.refresh_token_tag is None
+        assert read_refresh_token(user) == f"refresh-{index}"
+
+    # 복호화할 수 없는 토큰은 그대로 남겨야 함
+    db.refresh(broken)
+    assert broken.encrypted_refresh_token is not None
+
+    # 다시 실행해도 변환할 것이 없어야 함
+    assert migrate_refresh_tokens(session_factory, batch_size=2) == 0
+
+
+def test_ensure_envelope_column(tmp_path):
+    # 이전 스키마의 users 테이블에 컬럼이 추가되어야 함
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY)"))
+
+    ensure_envelope_column(engine)
+    ensure_envelope_column(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("users")}
+    assert "refresh_token_envelope" in columns
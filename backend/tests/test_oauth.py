@@ -1,20 +1,9 @@
-import json
 from unittest.mock import patch
 
+from conftest import MockResponse
 from fastapi import status
 
 
-# Google 응답 모킹
-class MockResponse:
-    def __init__(self, json_data, status_code):
-        self.json_data = json_data
-        self.status_code = status_code
-        self.text = json.dumps(json_data)
-
-    def json(self):
-        return self.json_data
-
-
 def test_authorize_endpoint(client, test_env):
     # /oauth/authorize 엔드포인트 테스트
     response = client.get("/oauth/authorize")
@@ -35,8 +24,8 @@ def test_authorize_endpoint(client, test_env):
     assert "oauth_nonce" in cookies
 
 
-@patch("requests.post")
-@patch("app.auth.oauth.verify_id_token")
+@patch("requests.Session.post")
+@patch("app.auth.oauth.averify_id_token")
 def test_oauth_callback(mock_verify_id_token, mock_post, client, test_env, db):
     # verify_id_token 모킹
     mock_verify_id_token.return_value = {
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import jwt
+import pytest
+from app.auth.providers import OIDCProvider, get_provider
+from app.cache import MemoryBackend, SharedCache
+from conftest import MockResponse
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+ISSUER = "https://idp.example.com"
+
+
+@pytest.fixture
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _jwks(private_key, kid):
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    return {"keys": [jwk]}
+
+
+def _id_token(private_key, kid, **claims):
+    payload = {
+        "iss": ISSUER,
+        "aud": "client-id",
+        "sub": "user-1",
+        "exp": int(time.time()) + 300,
+        **claims,
+    }
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def _mock_idp(provider, jwks_documents):
+    discovery = {
+        "issuer": ISSUER,
+        "authorization_endpoint": f"{ISSUER}/authorize",
+        "token_endpoint": f"{ISSUER}/token",
+        "jwks_uri": f"{ISSUER}/jwks",
+    }
+    jwks_iter = iter(jwks_documents)
+
+    def fake_get(url, timeout=None):
+        if url == provider.discovery_url:
+            return MockResponse(discovery)
+        return MockResponse(next(jwks_iter))
+
+    return patch.object(provider.session, "get", side_effect=fake_get)
+
+
+def test_discovery_and_jwks_are_cached(signing_key):
+    # 디스커버리 문서와 JWKS는 로그인마다 다시 가져오지 않아야 함
+    provider = OIDCProvider("example", ISSUER, "client-id", "secret")
+
+    with _mock_idp(provider, [_jwks(signing_key, "k1")]) as mock_get:
+        for _ in range(3):
+            payload = provider.verify_id_token(_id_token(signing_key, "k1"))
+            assert payload["sub"] == "user-1"
+
+        assert "example.com/authorize" in provider.authorization_url({"a": "b"})
+        assert mock_get.call_count == 2
+
+    stats = provider.stats()
+    assert stats["discovery_fetches"] == 1
+    assert stats["jwks_fetches"] == 1
+    assert stats["jwks_hits"] == 2
+    # 서명 키는 한 번만 파싱
+    assert stats["parsed_keys"] == 1
+    assert provider.parsed_signing_key("k1") is provider.parsed_signing_key("k1")
+
+
+def test_unknown_kid_refetches_jwks(signing_key):
+    # 키 교체 시 JWKS를 한 번 다시 가져오는지 확인
+    rotated_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    provider = OIDCProvider("example", ISSUER, "client-id", "secret")
+
+    with _mock_idp(
+        provider,
+        [_jwks(signing_key, "k1"), _jwks(rotated_key, "k2"), {"keys": []}],
+    ):
+        provider.verify_id_token(_id_token(signing_key, "k1"))
+        payload = provider.verify_id_token(_id_token(rotated_key, "k2"))
+        assert payload["sub"] == "user-1"
+
+        with pytest.raises(ValueError):
+            provider.verify_id_token(_id_token(rotated_key, "k3"))
+
+
+def test_jwks_shared_across_nodes(signing_key):
+    # 다른 노드가 가져온 JWKS는 공유 캐시에서 읽고, 키 교체 시에만 다시 가져옴
+    backend = MemoryBackend()
+    nodes = [
+        OIDCProvider(
+            "example",
+            ISSUER,
+            "client-id",
+            "secret",
+            cache=SharedCache({}, 3600, backend=backend),
+        )
+        for _ in range(2)
+    ]
+    rotated_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    with _mock_idp(nodes[0], [_jwks(signing_key, "k1")]):
+        nodes[0].verify_id_token(_id_token(signing_key, "k1"))
+
+    with _mock_idp(nodes[1], [_jwks(rotated_key, "k2")]) as mock_get:
+        nodes[1].verify_id_token(_id_token(signing_key, "k1"))
+        assert nodes[1].stats()["jwks_fetches"] == 0
+        assert nodes[1].stats()["jwks_shared_hits"] == 1
+
+        # 공유된 JWKS에도 없는 키는 제공자에서 가져옴
+        nodes[1].verify_id_token(_id_token(rotated_key, "k2"))
+        assert nodes[1].stats()["jwks_fetches"] == 1
+        assert mock_get.call_count == 2  # 디스커버리 + JWKS
+
+    # 교체된 키를 가져온 노드가 있으면 다른 노드는 공유 캐시에서 다시 읽음
+    with _mock_idp(nodes[0], []) as mock_get:
+        nodes[0].verify_id_token(_id_token(rotated_key, "k2"))
+        mock_get.assert_not_called()
+    assert nodes[0].stats()["jwks_shared_hits"] == 1
+
+
+def test_wrong_issuer_rejected(signing_key):
+    # 다른 발급자의 토큰은 거부되어야 함
+    provider = OIDCProvider("example", ISSUER, "client-id", "secret")
+
+    with _mock_idp(provider, [_jwks(signing_key, "k1")]):
+        with pytest.raises(ValueError):
+            provider.verify_id_token(
+                _id_token(signing_key, "k1", iss="https://evil.example.com")
+            )
+
+
+def test_google_provider_uses_configured_endpoints():
+    # Google은 설정된 엔드포인트를 사용하므로 디스커버리 요청이 없어야 함
+    google = get_provider("google")
+
+    with patch.object(google.session, "get") as mock_get:
+        assert "accounts.google.com" in google.authorization_url({"a": "b"})
+        mock_get.assert_not_called()
+
+
+def test_login_with_registered_provider(client, db, signing_key):
+    # 등록된 다른 OIDC 공급자로 로그인하면 공급자 범위의 식별자가 저장되어야 함
+    from app.auth.providers import _providers, register_provider
+    from app.models.identity import UserIdentity
+    from app.models.user import User
+
+    provider = OIDCProvider("example", ISSUER, "client-id", "secret")
+    register_provider(provider)
+    try:
+        with _mock_idp(provider, [_jwks(signing_key, "k1")]):
+            response = client.get(
+                "/oauth/authorize?provider=example", follow_redirects=False
+            )
+            assert response.status_code == 302
+            assert response.headers["Location"].startswith(f"{ISSUER}/authorize")
+            assert "provider%3Dexample" in response.headers["Location"]
+
+            id_token = _id_token(
+                signing_key, "k1", email="other@example.com", name="Other"
+            )
+            token_response = MockResponse(
+                {"access_token": "access", "id_token": id_token}
+            )
+            with patch.object(provider.session, "post", return_value=token_response):
+                client.cookies.set("oauth_state", "test-state")
+                response = client.get(
+                    "/oauth/oauth2/callback?provider=example"
+                    "&code=test-code&state=test-state",
+                    follow_redirects=False,
+                )
+            assert response.status_code == 302
+            assert "session_token=" in response.headers["set-cookie"]
+
+        identity = db.query(UserIdentity).filter_by(provider="example").one()
+        assert identity.subject == "user-1"
+        user = db.get(User, identity.user_id)
+        assert user.email == "other@example.com"
+        assert user.google_id is None
+    finally:
+        _providers.pop("example", None)
+
+
+def test_unknown_provider(client):
+    # 등록되지 않은 공급자는 404
+    response = client.get("/oauth/authorize?provider=nope")
+    assert response.status_code == 404
+
+
+def test_provider_calls_run_off_the_event_loop(client):
+    # 제공자 HTTP 호출은 이벤트 루프가 아닌 작업 스레드에서 실행되어야 함
+    google = get_provider("google")
+    on_loop = []
+
+    def record(result):
+        def call(*args, **kwargs):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return result
+
+        return call
+
+    with patch.object(
+        google, "metadata", side_effect=record(google.metadata())
+    ), patch.object(
+        google.session,
+        "post",
+        side_effect=record(
+            MockResponse({"access_token": "access", "id_token": "id-token"})
+        ),
+    ), patch(
+        "app.auth.oauth.averify_id_token",
+        return_value={"sub": "1", "email": "a@example.com", "nonce": "n"},
+    ):
+        client.get("/oauth/authorize", follow_redirects=False)
+        client.cookies.set("oauth_state", "s")
+        client.cookies.set("oauth_nonce", "n")
+        client.get("/oauth/oauth2/callback?code=c&state=s", follow_redirects=False)
+
+    # authorize의 디스커버리 조회, 토큰 교환과 그 안의 디스커버리 조회
+    assert on_loop == [False, False, False]
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from app.auth.session_store import (
+    SessionStore,
+    TimingWheel,
+    hash_session_id,
+    is_opaque_session_id,
+)
+from app.cache import MemoryBackend, SharedCache
+from app.models.session import UserSession
+from sqlalchemy import event
+
+
+def _cache_node(backend):
+    return SharedCache(namespace_ttls={}, default_ttl_seconds=60, backend=backend)
+
+
+def test_create_and_resolve_session(db, make_user):
+    # 세션 생성 후 조회 테스트
+    store = SessionStore(max_entries=10, tick_seconds=1, ttl_seconds=60)
+    user = make_user()
+
+    session_id = store.create(db, user.id, user.email, "user", user.name, None)
+
+    # 쿠키 값은 JWT가 아닌 짧은 불투명 ID
+    assert is_opaque_session_id(session_id)
+    assert len(session_id) < 40
+
+    claims = store.resolve(db, session_id)
+    assert claims["sub"] == str(user.id)
+    assert claims["email"] == "test@example.com"
+    assert claims["role"] == "user"
+
+    # 테이블에는 원본 ID가 아닌 해시가 저장됨
+    assert db.get(UserSession, session_id) is None
+
+
+def test_evicted_session_reloads_from_table(db, make_user):
+    # 메모리 한도를 넘으면 제거되지만 테이블에서 다시 로드되는지 확인
+    store = SessionStore(max_entries=1, tick_seconds=1, ttl_seconds=60)
+    user = make_user()
+
+    first = store.create(db, user.id, user.email, "user", None, None)
+    store.create(db, user.id, user.email, "user", None, None)
+    assert len(store) == 1
+    assert store.evictions == 1
+
+    claims = store.resolve(db, first)
+    assert claims["sub"] == str(user.id)
+    assert store.misses == 1
+
+
+def test_expired_and_revoked_sessions(db, clock, make_user):
+    # 만료 및 폐기된 세션은 조회되지 않아야 함
+    store = SessionStore(max_entries=10, tick_seconds=1, ttl_seconds=60, clock=clock)
+    user = make_user()
+
+    expired = store.create(
+        db, user.id, user.email, "user", None, None, timedelta(seconds=1)
+    )
+    revoked = store.create(db, user.id, user.email, "user", None, None)
+
+    clock.now += 2.1
+    assert store.resolve(db, expired) is None
+    assert store.expirations == 1
+
+    store.revoke(db, revoked)
+    assert store.resolve(db, revoked) is None
+    assert store.resolve(db, "unknown-session") is None
+
+
+def test_purge_expired(db, clock, make_user):
+    # 만료된 세션 행만 테이블에서 삭제되어야 함
+    store = SessionStore(max_entries=10, tick_seconds=1, ttl_seconds=60, clock=clock)
+    user = make_user()
+
+    store.create(db, user.id, user.email, "user", None, None, timedelta(seconds=1))
+    active = store.create(db, user.id, user.email, "user", None, None)
+
+    clock.now += 5
+    assert store.purge_expired(db) == 1
+    assert db.query(UserSession).count() == 1
+    assert store.resolve(db, active) is not None
+
+
+def test_timing_wheel_advance():
+    # 경과한 슬롯의 키만 반환되는지 확인
+    wheel = TimingWheel(tick_seconds=10, size=4)
+    now = wheel._current_tick * 10
+    wheel.schedule("soon", now + 15)
+    wheel.schedule("later", now + 35)
+
+    assert wheel.advance(now + 5) == []
+    assert wheel.advance(now + 25) == ["soon"]
+    assert wheel.advance(now + 45) == ["later"]
+
+
+def test_me_endpoint_with_opaque_session(client, db, make_user):
+    # 불투명 세션 ID로 /api/me 접근 테스트
+    from app.auth.session_store import session_store
+
+    user = make_user()
+    session_id = session_store.create(db, user.id, user.email, "user", None, None)
+
+    client.cookies.set("session_token", session_id)
+    response = client.get("/api/me")
+    assert response.status_code == 200
+    assert response.json()["user_id"] == str(user.id)
+    assert response.json()["email"] == "test@example.com"
+
+    client.cookies.set("session_token", "not-a-session")
+    response = client.get("/api/me")
+    assert response.status_code == 401
+
+
+def test_logout_revokes_opaque_session(client, db, make_user):
+    # 로그아웃하면 불투명 세션이 서버에서 폐기되어야 함
+    from app.auth.session_store import session_store
+
+    user = make_user()
+    session_id = session_store.create(db, user.id, user.email, "user", None, None)
+
+    client.cookies.set("session_token", session_id)
+    response = client.post("/oauth/logout")
+    assert response.status_code == 200
+    assert session_store.resolve(db, session_id) is None
+
+
+def test_aresolve_loads_misses_off_the_event_loop(db, make_user):
+    # 메모리 적중은 바로 응답하고, 미스는 작업 스레드에서 조회
+    store = SessionStore(max_entries=10, tick_seconds=1, ttl_seconds=60)
+    user = make_user()
+    session_id = store.create(db, user.id, user.email, "user", None, None)
+    threads = []
+
+    def load(db, key):
+        threads.append(threading.get_ident())
+        return SessionStore._load(store, db, key)
+
+    async def run():
+        with patch.object(store, "_load", side_effect=load):
+            hit = await store.aresolve(db, session_id)
+            store.evict(hash_session_id(session_id))
+            miss = await store.aresolve(db, session_id)
+        return hit, miss, threading.get_ident()
+
+    hit, miss, loop_thread = asyncio.run(run())
+    assert hit["sub"] == miss["sub"] == str(user.id)
+    assert len(threads) == 1
+    assert threads[0] != loop_thread
+
+
+def test_resolve_many_loads_misses_in_one_query(db, make_user):
+    # 배치 조회는 메모리 미스를 한 번의 쿼리로 가져와야 함
+    store = SessionStore(max_entries=10, tick_seconds=1, ttl_seconds=60)
+    user = make_user()
+    session_ids = [
+        store.create(db, user.id, user.email, "user", None, None) for _ in range(3)
+    ]
+    store.evict(hash_session_id(session_ids[0]))
+    store.evict(hash_session_id(session_ids[1]))
+
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        results = store.resolve_many(db, [*session_ids, "unknown-id"])
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert [r["sub"] if r else None for r in results] == [str(user.id)] * 3 + [None]
+    assert len(statements) == 1
+    assert len(store) == 3
+
+
+def test_revoke_evicts_session_on_other_nodes(db, make_user):
+    # 한 노드에서 폐기한 세션은 다른 노드의 메모리에서도 제거되어야 함
+    backend = MemoryBackend()
+    node_a = SessionStore(10, 1, 60, cache=_cache_node(backend))
+    node_b = SessionStore(10, 1, 60, cache=_cache_node(backend))
+    user = make_user()
+
+    session_id = node_a.create(db, user.id, user.email, "user", None, None)
+
+    # 다른 노드는 테이블 대신 공유 캐시에서 세션을 읽음
+    with patch.object(db, "get", side_effect=AssertionError("table lookup")):
+        assert node_b.resolve(db, session_id)["sub"] == str(user.id)
+    assert len(node_b) == 1
+
+    node_a.revoke(db, session_id)
+    assert len(node_b) == 0
+    assert node_b.resolve(db, session_id) is None
@@ -2,11 +2,17 @@ import base64
 
 import pytest
 from app.auth.utils import (
+    ENVELOPE_VERSION,
     decrypt_refresh_token,
     encrypt_refresh_token,
     generate_nonce,
     generate_state,
+    open_refresh_token,
+    read_refresh_token,
+    seal_refresh_token,
 )
+from app.config import Settings, settings
+from app.models.user import User
 
 
 def test_generate_state():
@@ -46,3 +52,57 @@ def test_encrypt_decrypt_refresh_token():
     # 복호화 및 원본과 일치하는지 확인
     decrypted = decrypt_refresh_token(encrypted, iv, tag)
     assert decrypted == original_token
+
+
+def test_refresh_token_envelope():
+    # 바이너리 봉투 형식 암호화/복호화 테스트
+    envelope = seal_refresh_token("test-refresh-token")
+
+    # 버전과 키 ID가 기록되어야 함
+    assert envelope[0] == ENVELOPE_VERSION
+    assert envelope[1] == settings.ENCRYPTION_KEY_ID
+    # 헤더 2 + IV 12 + 태그 16 바이트만 추가되어야 함
+    assert len(envelope) == len("test-refresh-token") + 30
+    assert open_refresh_token(envelope) == "test-refresh-token"
+
+    # 헤더가 변조되면 복호화에 실패해야 함
+    with pytest.raises(ValueError):
+        open_refresh_token(b"\x02" + envelope[1:])
+    with pytest.raises(Exception):
+        open_refresh_token(envelope[:1] + b"\x09" + envelope[2:])
+
+
+def test_refresh_token_envelope_previous_key(monkeypatch):
+    # 키 교체 후에도 이전 키로 봉인된 토큰을 읽을 수 있어야 함
+    envelope = seal_refresh_token("test-refresh-token")
+    monkeypatch.setattr(
+        settings, "ENCRYPTION_PREVIOUS_KEYS", {1: settings.ENCRYPTION_KEY}
+    )
+    monkeypatch.setattr(settings, "ENCRYPTION_KEY_ID", 2)
+    monkeypatch.setattr(
+        settings, "ENCRYPTION_KEY", base64.b64encode(b"n" * 32).decode()
+    )
+
+    assert open_refresh_token(envelope) == "test-refresh-token"
+    assert seal_refresh_token("test-refresh-token")[1] == 2
+
+
+def test_encryption_key_id_range():
+    # 봉투 헤더의 1바이트에 들어가지 않는 키 ID는 설정 단계에서 거부
+    with pytest.raises(ValueError):
+        Settings(ENCRYPTION_KEY_ID=256)
+    assert Settings(ENCRYPTION_KEY_ID=255).ENCRYPTION_KEY_ID == 255
+
+
+def test_read_refresh_token_both_formats():
+    # 기존 base64 컬럼과 봉투 형식을 모두 읽을 수 있어야 함
+    token, iv, tag = encrypt_refresh_token("legacy-token")
+    legacy = User(
+        encrypted_refresh_token=token, refresh_token_iv=iv, refresh_token_tag=tag
+    )
+    assert read_refresh_token(legacy) == "legacy-token"
+
+    current = User(refresh_token_envelope=seal_refresh_token("new-token"))
+    assert read_refresh_token(current) == "new-token"
+
+    assert read_refresh_token(User()) is None
@@ -0,0 +1,85 @@
+import asyncio
+from unittest.mock import patch
+
+from app.auth.providers import OIDCProvider
+from app.warmup import Warmup, warm_database_pools, warm_http_connections, warm_jwks
+from conftest import MockResponse
+from sqlalchemy import create_engine
+from tests.test_providers import ISSUER
+
+
+def _provider():
+    return OIDCProvider(
+        "example",
+        ISSUER,
+        "client-id",
+        "secret",
+        metadata={
+            "authorization_endpoint": f"{ISSUER}/authorize",
+            "token_endpoint": f"{ISSUER}/token",
+            "jwks_uri": f"{ISSUER}/jwks",
+        },
+    )
+
+
+def test_warm_database_pools(tmp_path):
+    # 풀 크기만큼 연결을 미리 열어 두어야 함
+    engine = create_engine(f"sqlite:///{tmp_path / 'warm.db'}", pool_size=3)
+    warm_database_pools([engine], connections=10)
+    assert engine.pool.checkedin() == 3
+
+
+def test_warm_http_and_jwks():
+    # 토큰 엔드포인트 연결과 JWKS를 미리 가져와야 함
+    provider = _provider()
+    jwks = {"keys": [{"kty": "oct", "kid": "k1", "k": "c2VjcmV0"}]}
+
+    with patch.object(
+        provider.session, "head", return_value=MockResponse({}, 405)
+    ) as mock_head, patch.object(
+        provider.session, "get", return_value=MockResponse(jwks)
+    ):
+        warm_http_connections([provider])
+        warm_jwks([provider])
+
+    assert mock_head.call_args.args[0] == f"{ISSUER}/token"
+    assert "k1" in provider.jwks()
+    assert provider.stats()["jwks_fetches"] == 1
+    # 파싱된 키가 캐시되어 첫 검증에서 다시 파싱하지 않음
+    assert provider.stats()["parsed_keys"] == 1
+
+
+def test_warmup_reports_progress():
+    # 모든 단계가 끝나면 준비 완료, 실패한 단계는 상태에 기록
+    warmup = Warmup()
+    assert warmup.status()["status"] == "warming"
+
+    with patch("app.warmup.all_providers", return_value=[_provider()]), patch(
+        "app.warmup.warm_database_pools"
+    ), patch("app.warmup.warm_http_connections"), patch(
+        "app.warmup.warm_jwks", side_effect=ConnectionError("offline")
+    ):
+        asyncio.run(warmup.run(timeout_seconds=5))
+
+    status = warmup.status()
+    assert warmup.ready
+    assert status["status"] == "ready"
+    assert status["steps"]["database"]["status"] == "ok"
+    assert status["steps"]["jwks"]["status"] == "failed"
+    assert "offline" in status["steps"]["jwks"]["error"]
+
+
+def test_ready_endpoint(client):
+    # 워밍업 중에는 503, 완료 후에는 200
+    from app.warmup import warmup
+
+    assert client.get("/ready").status_code == 200
+    assert client.get("/health").status_code == 200
+
+    warmup.ready = False
+    try:
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "warming"
+    finally:
+        warmup.ready = True